@@ -0,0 +1,28 @@
+"""lead pagination indexes
+
+Revision ID: 205e7f9ee586
+Revises: 6c30de293d37
+Create Date: 2026-10-18 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '205e7f9ee586'
+down_revision: Union[str, None] = '6c30de293d37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_leads_status_id', 'leads', ['status', 'id'], unique=False)
+    op.create_index('ix_leads_country_id', 'leads', ['country', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_leads_country_id', table_name='leads')
+    op.drop_index('ix_leads_status_id', table_name='leads')
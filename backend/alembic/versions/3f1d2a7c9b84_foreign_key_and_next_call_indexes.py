@@ -0,0 +1,32 @@
+"""foreign key and next call indexes
+
+Revision ID: 3f1d2a7c9b84
+Revises: 205e7f9ee586
+Create Date: 2026-10-18 14:03:27.512946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d2a7c9b84'
+down_revision: Union[str, None] = '205e7f9ee586'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_calls_tracking_next_call_date_time', 'calls_tracking', ['next_call_date', 'next_call_time'], unique=False)
+    op.create_index(op.f('ix_calls_tracking_lead_id'), 'calls_tracking', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_point_of_contacts_lead_id'), 'point_of_contacts', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_leads_name'), 'leads', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_leads_name'), table_name='leads')
+    op.drop_index(op.f('ix_point_of_contacts_lead_id'), table_name='point_of_contacts')
+    op.drop_index(op.f('ix_calls_tracking_lead_id'), table_name='calls_tracking')
+    op.drop_index('ix_calls_tracking_next_call_date_time', table_name='calls_tracking')
@@ -0,0 +1,31 @@
+"""lead name trigram index
+
+Revision ID: 9a4e6b2d1c57
+Revises: 3f1d2a7c9b84
+Create Date: 2026-10-18 16:21:08.734215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b2d1c57'
+down_revision: Union[str, None] = '3f1d2a7c9b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_leads_name_trgm', 'leads', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_leads_name_trgm', table_name='leads', postgresql_using='gin')
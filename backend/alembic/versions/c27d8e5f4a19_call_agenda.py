@@ -0,0 +1,65 @@
+"""call agenda
+
+Revision ID: c27d8e5f4a19
+Revises: 9a4e6b2d1c57
+Create Date: 2026-10-18 17:42:51.203318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d8e5f4a19'
+down_revision: Union[str, None] = '9a4e6b2d1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# UTC instant of the IST schedule of a call
+SCHEDULED_AT = {
+    'postgresql': "(c.next_call_date + c.next_call_time) AT TIME ZONE 'Asia/Kolkata' AT TIME ZONE 'UTC'",
+    'sqlite': "datetime(c.next_call_date || ' ' || c.next_call_time, '-330 minutes')",
+}
+
+
+def upgrade() -> None:
+    op.create_table('call_agenda',
+    sa.Column('call_id', sa.Integer(), nullable=False),
+    sa.Column('lead_id', sa.Integer(), nullable=False),
+    sa.Column('poc_id', sa.Integer(), nullable=False),
+    sa.Column('lead_name', sa.String(), nullable=False),
+    sa.Column('poc_name', sa.String(), nullable=False),
+    sa.Column('poc_contact', sa.String(), nullable=False),
+    sa.Column('frequency', sa.Integer(), nullable=True),
+    sa.Column('next_call_date', sa.Date(), nullable=False),
+    sa.Column('next_call_time', sa.Time(), nullable=False),
+    sa.Column('scheduled_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['call_id'], ['calls_tracking.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('call_id')
+    )
+    op.create_index(op.f('ix_call_agenda_lead_id'), 'call_agenda', ['lead_id'], unique=False)
+    op.create_index(op.f('ix_call_agenda_poc_id'), 'call_agenda', ['poc_id'], unique=False)
+    op.create_index(op.f('ix_call_agenda_scheduled_at'), 'call_agenda', ['scheduled_at'], unique=False)
+    # Materialize the agenda of the calls scheduled so far
+    op.execute(f"""
+        INSERT INTO call_agenda (call_id, lead_id, poc_id, lead_name, poc_name, poc_contact,
+                                 frequency, next_call_date, next_call_time, scheduled_at)
+        SELECT c.id, c.lead_id, c.poc_id, l.name, p.name, p.phone_number,
+               c.frequency, c.next_call_date, c.next_call_time, {SCHEDULED_AT[op.get_bind().dialect.name]}
+        FROM calls_tracking c
+        JOIN leads l ON l.id = c.lead_id
+        JOIN point_of_contacts p ON p.id = c.poc_id
+        WHERE c.next_call_date IS NOT NULL
+    """)
+    # Schedules are now read from the agenda only
+    op.drop_index('ix_calls_tracking_next_call_date_time', table_name='calls_tracking')
+
+
+def downgrade() -> None:
+    op.create_index('ix_calls_tracking_next_call_date_time', 'calls_tracking', ['next_call_date', 'next_call_time'], unique=False)
+    op.drop_index(op.f('ix_call_agenda_scheduled_at'), table_name='call_agenda')
+    op.drop_index(op.f('ix_call_agenda_poc_id'), table_name='call_agenda')
+    op.drop_index(op.f('ix_call_agenda_lead_id'), table_name='call_agenda')
+    op.drop_table('call_agenda')
@@ -55,7 +55,6 @@ class MongoDbDatabase:
             collection_name (str): The name of the new collection.
         """
         self.collection = self.db[collection_name]
-        self.create_indexes()
 
     def get_collection(self):
         """
@@ -65,22 +64,25 @@ class MongoDbDatabase:
             raise ValueError("Collection not set. Use 'set_collection()' first.")
         return self.collection
 
-    def create_indexes(self):
+    async def create_indexes(self):
         """
         Creates indexes on the current collection based on predefined configurations.
+        Per-lead timelines are read from the (lead_id, interaction_at, _id) index in
+        index order, and so is the timeline of all interactions; the _id suffix
+        serves the tie-breaker of their cursor pagination.
         """
         if self.collection is None:
             raise ValueError("Collection not set. Use 'set_collection()' first.")
 
         index_configs = [
-            [('lead_id', 1)],
-            [('interaction_date', 1)],
+            [('lead_id', 1), ('interaction_at', -1), ('_id', -1)],
+            [('interaction_at', -1), ('_id', -1)],
             [('order.price', 1), ('order.quantity', 1)]
         ]
 
         try:
             for index_config in index_configs:
-                self.collection.create_index(index_config)
+                await self.collection.create_index(index_config)
                 print(f"Created index: {index_config}")
         except PyMongoError as e:
             print(f"Error creating indexes: {e}")
@@ -0,0 +1,79 @@
+"""
+Postgres Connection Pool Module
+
+Pool settings of the Postgres engines, read from the environment, and the
+Prometheus metrics of the pools: checked-out and overflow connections per
+engine and the time spent waiting for a connection.
+"""
+import os
+import time
+from dotenv import load_dotenv
+from prometheus_client import Gauge, Histogram # type: ignore
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+load_dotenv(dotenv_path="app/.env")
+
+POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = int(os.getenv("POSTGRES_POOL_TIMEOUT", 30))
+# Recycle connections before RDS or a load balancer drops them as idle
+POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE", 1800))
+# Test connections on checkout so connections killed by a failover are replaced
+POOL_PRE_PING = os.getenv("POSTGRES_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out of the pool", ["engine"]
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections", "Connections open above the pool size", ["engine"]
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool", ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+
+class TimedQueuePool(QueuePool):
+    "QueuePool recording how long each checkout waits for a connection"
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(self.engine_label).observe(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    "AsyncAdaptedQueuePool recording how long each checkout waits for a connection"
+    engine_label = "async"
+
+
+class TimedReplicaQueuePool(TimedAsyncQueuePool):
+    "Pool of the read replica engine"
+    engine_label = "replica"
+
+
+def pool_options(url, poolclass):
+    """Keyword arguments of create_engine() / create_async_engine() for a pool.
+    SQLite databases (local runs and tests) keep the pool of their dialect."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def instrument_pool(engine, label: str):
+    "Report the connections of an engine's pool; reads engine.pool so recreated pools are followed"
+    if not isinstance(engine.pool, QueuePool):
+        return
+    POOL_CHECKED_OUT.labels(label).set_function(lambda: engine.pool.checkedout())
+    POOL_OVERFLOW.labels(label).set_function(lambda: max(engine.pool.overflow(), 0))
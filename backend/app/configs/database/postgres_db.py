@@ -1,11 +1,22 @@
-"""Postgres Database Configuration Module"""
+"""Postgres Database Configuration Module
+
+The application talks to Postgres through an async engine (asyncpg), so queries
+never block the event loop. The synchronous engine stays available for Alembic,
+database creation and scripts.
+
+GET routes read through a read-only session bound to the replica of
+POSTGRES_REPLICA_URL when one is configured, or to the primary otherwise.
+"""
 
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import ProgrammingError
+from .pool import TimedQueuePool, TimedAsyncQueuePool, TimedReplicaQueuePool, pool_options, instrument_pool
 
 load_dotenv(dotenv_path="app/.env")
 
@@ -13,15 +24,64 @@ load_dotenv(dotenv_path="app/.env")
 POSTGRES_URL = os.getenv('POSTGRES_URL',"sqlite:///./test.db")
 POSTGRES_URL_RDS = os.getenv('POSTGRES_URL_RDS')
 POSTGRES_URL_RDS_II = os.getenv('POSTGRES_URL_RDS_II')
+POSTGRES_REPLICA_URL = os.getenv('POSTGRES_REPLICA_URL')
 DB_NAME = os.getenv('POSTGRES_DB')
 
 # Create engine without specifying the database name (for creating the database if not exists)
 engine_without_db = create_engine(POSTGRES_URL_RDS_II.rsplit('/', 1)[0])
-engine = create_engine(POSTGRES_URL_RDS_II)
+engine = create_engine(POSTGRES_URL_RDS_II, **pool_options(POSTGRES_URL_RDS_II, TimedQueuePool))
+instrument_pool(engine, "sync")
+
+def enable_sqlite_foreign_keys(engine):
+    "SQLite (local runs and tests) only enforces foreign keys when asked to, like Postgres always does"
+    def on_connect(connection, _):
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", on_connect)
+
 
+enable_sqlite_foreign_keys(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def to_async_url(url: str):
+    "Database URL of the async driver for a synchronous database URL"
+    url = make_url(url)
+    url = url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if "sslmode" in url.query:
+        # asyncpg names the libpq sslmode parameter ssl
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url
+
+
+async_engine = create_async_engine(to_async_url(POSTGRES_URL_RDS_II), **pool_options(POSTGRES_URL_RDS_II, TimedAsyncQueuePool))
+instrument_pool(async_engine, "async")
+enable_sqlite_foreign_keys(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def create_read_engine(replica_url: str = None):
+    """Async engine of the read-only sessions: the replica when a URL is given, or the
+    primary engine (sharing its pool) otherwise. Transactions are read-only either way."""
+    if replica_url:
+        read_engine = create_async_engine(to_async_url(replica_url), **pool_options(replica_url, TimedReplicaQueuePool))
+        instrument_pool(read_engine, "replica")
+        enable_sqlite_foreign_keys(read_engine.sync_engine)
+    else:
+        read_engine = async_engine
+    return read_engine.execution_options(postgresql_readonly=True)
+
+
+# Read-only sessions serve uncached reads only (exports): cache entries are built on the
+# primary, since an entry built from a lagging replica would be served until it expires.
+read_engine = create_read_engine(POSTGRES_REPLICA_URL)
+ReadOnlySessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def create_database_if_not_exists():
     "Function to create the database if it does not exist"
     try:
@@ -47,3 +107,9 @@ def get_postgres_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_postgres_db():
+    "Function to create an async session for the database"
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,287 @@
+"""
+Redis Cache Module
+
+Cached entries are tagged by the entities they were built from. Every tag has a
+version counter in Redis and the versions of an entry's tags are part of its key,
+so invalidating a tag is a single INCR: readers compute a new key and never see
+entries built before the write. Superseded entries simply expire through their TTL.
+
+Misses are coalesced: concurrent callers in a process share one in-flight build,
+and a short Redis lock lets a single worker rebuild while the others wait for it.
+
+Decoded entries are also kept in the in-process cache of every worker, which is
+kept coherent through the invalidation channel (see local_cache.py).
+
+An entry is stored as a one-line JSON header (build time, response headers, ...)
+followed by the orjson-serialized payload. Payloads are never decoded on a hit:
+the bytes are sent as the response body as they are. Payloads larger than
+COMPRESSION_THRESHOLD are stored zlib-compressed, which the header records as
+their codec; they are decompressed once per worker when loaded into its
+in-process cache.
+
+Every cache operation touches Redis in at most one round trip per step (see
+commands.py): a read resolves tag versions and fetches the entry together, a
+rebuild stores the entry and releases its lock together, and an invalidation
+bumps all of its tags and publishes them together.
+
+Hits, misses, rebuild times, entry sizes and invalidations are exported to
+Prometheus per key family (see metrics.py).
+"""
+import asyncio
+import inspect
+import os
+import time
+import uuid
+import zlib
+from typing import Any, NamedTuple
+import orjson
+import redis.asyncio as aioredis # type: ignore
+from dotenv import load_dotenv
+from fastapi import Response
+from ...utils.utils import json_dumps
+from .local_cache import local_cache, INVALIDATION_CHANNEL
+from . import commands
+from .metrics import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    CACHE_STALE_HITS,
+    CACHE_REBUILD_SECONDS,
+    CACHE_ENTRY_BYTES,
+    CACHE_INVALIDATIONS,
+    key_family
+)
+
+load_dotenv(dotenv_path="app/.env")
+
+TAG_VERSION_PREFIX = "tag-version:"
+DEFAULT_TTL = 3600
+LOCK_PREFIX = "lock:"
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", 16 * 1024))
+COMPRESSION_LEVEL = 6
+CODECS = {
+    "zlib": (lambda body: zlib.compress(body, COMPRESSION_LEVEL), zlib.decompress)
+}
+
+_in_flight = {}
+_refreshing = set()
+# Strong references to the background refreshes: the event loop only keeps weak ones
+_refresh_tasks = set()
+
+# Entity tags
+LEADS_TAG = "leads"
+POCS_TAG = "pocs"
+CALLS_TAG = "calls"
+INTERACTIONS_TAG = "interactions"
+PERFORMANCE_TAG = "performance"
+
+
+class Payload(NamedTuple):
+    "A value to cache along with the response headers to serve it with"
+    value: Any
+    headers: dict
+
+
+def lead_tag(lead_id):
+    "Tag for entries derived from a single lead"
+    return f"lead:{lead_id}"
+
+
+def version_keys(tags):
+    "Redis keys of the version counters of the tags"
+    return [f"{TAG_VERSION_PREFIX}{tag}" for tag in tags]
+
+
+def versioned_key(prefix: str, tags, versions):
+    "Key of an entry for the given tag versions (mirrored by commands.LOOKUP_SCRIPT)"
+    stamp = ",".join(f"{tag}@{version}" for tag, version in zip(tags, versions))
+    return f"{prefix}:{stamp}"
+
+
+def encode(value):
+    "Serialize a value, or a Payload, with its entry header, compressing large payloads"
+    header = {"at": time.time()}
+    if isinstance(value, Payload):
+        header["headers"] = value.headers
+        value = value.value
+    body = json_dumps(value)
+    if len(body) > COMPRESSION_THRESHOLD:
+        header["codec"] = "zlib"
+        body = CODECS["zlib"][0](body)
+    return header, json_dumps(header) + b"\n" + body
+
+
+def load(key: str, data: bytes, ex=DEFAULT_TTL):
+    "Split and decompress an entry read from Redis and keep it in the in-process cache"
+    header, _, body = data.partition(b"\n")
+    header = orjson.loads(header)
+    if "codec" in header:
+        body = CODECS[header["codec"]][1](body)
+    entry = (header, body)
+    local_cache.set(key, entry, len(body), ex)
+    return entry
+
+
+async def lookup(redis: aioredis.Redis, family: str, tags, parts, ex=DEFAULT_TTL):
+    """Resolve the versioned key of an entry and fetch the entry, in one round trip at most.
+
+    Returns the key and the (header, body) entry, or None for the entry on a miss.
+    """
+    prefix = ":".join([family, *(str(part) for part in parts)])
+    versions = local_cache.get_versions(tags)
+    if versions is not None:
+        key = versioned_key(prefix, tags, versions)
+        entry = local_cache.get(key)
+        if entry is None:
+            data = await redis.get(key)
+            entry = load(key, data, ex) if data else None
+            tier = "redis"
+        else:
+            tier = "local"
+    else:
+        generation = local_cache.generation
+        key, data, versions = await commands.lookup(redis, version_keys(tags), tags, prefix)
+        local_cache.update_versions(dict(zip(tags, versions)), generation)
+        entry = local_cache.get(key)
+        tier = "local"
+        if entry is None and data:
+            entry = load(key, data, ex)
+            tier = "redis"
+    if entry is None:
+        CACHE_MISSES.labels(family).inc()
+    else:
+        CACHE_HITS.labels(family, tier).inc()
+    return key, entry
+
+
+async def build(builder):
+    "Run a synchronous or asynchronous builder"
+    value = builder()
+    if inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+async def store(redis: aioredis.Redis, key: str, builder, token: str, ex=DEFAULT_TTL):
+    "Build an entry, serialize it once, then write it and release its lock in one round trip"
+    family = key_family(key)
+    with CACHE_REBUILD_SECONDS.labels(family).time():
+        value = await build(builder)
+    _, data = encode(value)
+    CACHE_ENTRY_BYTES.labels(family).observe(len(data))
+    await commands.set_and_unlock(redis, key, data, ex, f"{LOCK_PREFIX}{key}", token)
+    return load(key, data, ex)
+
+
+def to_response(entry, **headers):
+    "Serve an entry's body as it is"
+    header, body = entry
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**header.get("headers", {}), **headers}
+    )
+
+
+async def single_flight(key: str, factory):
+    "Run `factory()` once per key in this process and share its result with concurrent callers"
+    future = _in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+async def rebuild(redis: aioredis.Redis, key: str, builder, ex=DEFAULT_TTL):
+    "Rebuild an entry while holding its Redis lock, or wait for the worker holding it"
+    lock_key = f"{LOCK_PREFIX}{key}"
+    token = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LOCK_TIMEOUT
+    while True:
+        data, locked = await commands.get_or_lock(redis, key, lock_key, token, LOCK_TIMEOUT * 1000)
+        if data:
+            return load(key, data, ex)
+        if locked or loop.time() > deadline:
+            break
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+    try:
+        return await store(redis, key, builder, token, ex)
+    except Exception:
+        await commands.unlock(redis, lock_key, token)
+        raise
+
+
+async def refresh(redis: aioredis.Redis, key: str, builder, stale_after, ex=DEFAULT_TTL):
+    "Recompute a stale entry unless another worker is already doing it or has done it"
+    lock_key = f"{LOCK_PREFIX}{key}"
+    token = uuid.uuid4().hex
+    locked, data = await commands.lock_and_get(redis, key, lock_key, token, LOCK_TIMEOUT * 1000)
+    if not locked:
+        return
+    try:
+        if data and time.time() - orjson.loads(data.partition(b"\n")[0])["at"] <= stale_after:
+            load(key, data, ex)
+            await commands.unlock(redis, lock_key, token)
+            return
+        await store(redis, key, builder, token, ex)
+    except Exception as e:
+        await commands.unlock(redis, lock_key, token)
+        print(f"Background refresh of {key} failed: {e}")
+
+
+def schedule_refresh(redis: aioredis.Redis, key: str, builder, stale_after, ex=DEFAULT_TTL):
+    "Start a background refresh of an entry unless this process already runs one"
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+    task = asyncio.create_task(refresh(redis, key, builder, stale_after, ex))
+    _refresh_tasks.add(task)
+
+    def done(task):
+        _refresh_tasks.discard(task)
+        _refreshing.discard(key)
+    task.add_done_callback(done)
+
+
+async def cached(redis: aioredis.Redis, family: str, tags, parts, builder, ex=DEFAULT_TTL):
+    "Return a response with the cached entry, building it once with `builder` on a miss"
+    key, entry = await lookup(redis, family, tags, parts, ex)
+    if entry is None:
+        entry = await single_flight(key, lambda: rebuild(redis, key, builder, ex))
+    return to_response(entry)
+
+
+async def cached_with_freshness(redis: aioredis.Redis, family: str, tags, parts, builder, stale_after, ex=DEFAULT_TTL):
+    """Stale-while-revalidate: return the cached entry at once, refreshing it in the
+    background once it is older than `stale_after` seconds.
+
+    The response reports the cache status ("hit", "stale" or "miss") in X-Cache and
+    the age of the entry in seconds in Age.
+    """
+    key, entry = await lookup(redis, family, tags, parts, ex)
+    if entry is None:
+        entry = await single_flight(key, lambda: rebuild(redis, key, builder, ex))
+        status = "miss"
+    else:
+        status = "hit"
+    age = time.time() - entry[0]["at"]
+    if status == "hit" and age > stale_after:
+        schedule_refresh(redis, key, builder, stale_after, ex)
+        CACHE_STALE_HITS.labels(family).inc()
+        status = "stale"
+    return to_response(entry, **{"X-Cache": status, "Age": str(int(age))})
+
+
+async def invalidate(redis: aioredis.Redis, *tags, records=None):
+    """Invalidate every entry carrying any of the given tags in every worker, in one round trip.
+
+    `records` ({key: (data, ttl)}) are plain keys written through in the same round trip.
+    """
+    tags = sorted(set(tags))
+    for tag in tags:
+        CACHE_INVALIDATIONS.labels(key_family(tag)).inc()
+    versions = await commands.invalidate_tags(redis, version_keys(tags), tags, INVALIDATION_CHANNEL, records)
+    local_cache.update_versions(versions)
@@ -0,0 +1,113 @@
+"""
+Redis Commands Module
+
+Multi-key cache operations that each cost a single round trip to Redis.
+Sequences whose writes depend on their own reads run as Lua scripts (atomic,
+like MULTI blocks); independent commands are sent as one pipeline.
+"""
+import orjson
+import redis.asyncio as aioredis # type: ignore
+from redis.commands.core import AsyncScript # type: ignore
+
+# KEYS: tag version keys, then record keys.
+# ARGV: invalidation channel, number of tags, tags, then the data and TTL of each record.
+# Records are written before the versions move, so readers of the new versions see them.
+INVALIDATE_SCRIPT = AsyncScript(None, b"""
+local tag_count = tonumber(ARGV[2])
+for i = tag_count + 1, #KEYS do
+    local offset = 3 + tag_count + (i - tag_count - 1) * 2
+    redis.call("set", KEYS[i], ARGV[offset], "EX", ARGV[offset + 1])
+end
+local versions = {}
+for i = 1, tag_count do
+    versions[ARGV[i + 2]] = redis.call("incr", KEYS[i])
+end
+local message = cjson.encode(versions)
+redis.call("publish", ARGV[1], message)
+return message
+""")
+
+# KEYS: tag version keys. ARGV: key prefix, tags.
+# Builds the versioned key exactly like cache.versioned_key() and reads it.
+LOOKUP_SCRIPT = AsyncScript(None, b"""
+local versions = redis.call("mget", unpack(KEYS))
+local stamp = {}
+for i = 1, #KEYS do
+    versions[i] = tonumber(versions[i]) or 0
+    stamp[i] = ARGV[i + 1] .. "@" .. versions[i]
+end
+local key = ARGV[1] .. ":" .. table.concat(stamp, ",")
+return {key, redis.call("get", key), unpack(versions)}
+""")
+
+# KEYS: entry key, lock key. ARGV: lock token, lock timeout in milliseconds.
+GET_OR_LOCK_SCRIPT = AsyncScript(None, b"""
+local data = redis.call("get", KEYS[1])
+if data then
+    return {data, 0}
+end
+if redis.call("set", KEYS[2], ARGV[1], "NX", "PX", ARGV[2]) then
+    return {false, 1}
+end
+return {false, 0}
+""")
+
+# KEYS: entry key, lock key. ARGV: entry, entry TTL in seconds, lock token.
+SET_AND_UNLOCK_SCRIPT = AsyncScript(None, b"""
+redis.call("set", KEYS[1], ARGV[1], "EX", ARGV[2])
+if redis.call("get", KEYS[2]) == ARGV[3] then
+    redis.call("del", KEYS[2])
+end
+return 1
+""")
+
+# KEYS: lock key. ARGV: lock token.
+# Compare-and-delete so a worker never releases a lock that expired and was re-acquired.
+UNLOCK_SCRIPT = AsyncScript(None, b"""
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+""")
+
+
+async def invalidate_tags(redis: aioredis.Redis, version_keys, tags, channel: str, records=None):
+    """Write the records ({key: (data, ttl)}), then increment the versions of the tags
+    and publish them, returning {tag: version}"""
+    records = records or {}
+    args = [channel, len(tags), *tags]
+    for data, ex in records.values():
+        args += [data, ex]
+    message = await INVALIDATE_SCRIPT(keys=[*version_keys, *records], args=args, client=redis)
+    return orjson.loads(message)
+
+
+async def lookup(redis: aioredis.Redis, version_keys, tags, prefix: str):
+    "Resolve the versioned key of an entry and read it, returning (key, data, versions)"
+    key, data, *versions = await LOOKUP_SCRIPT(keys=version_keys, args=[prefix, *tags], client=redis)
+    return key.decode(), data, versions
+
+
+async def get_or_lock(redis: aioredis.Redis, key: str, lock_key: str, token: str, timeout_ms: int):
+    "Read an entry, or take its rebuild lock if it is missing; returns (data, locked)"
+    data, locked = await GET_OR_LOCK_SCRIPT(keys=[key, lock_key], args=[token, timeout_ms], client=redis)
+    return data, bool(locked)
+
+
+async def lock_and_get(redis: aioredis.Redis, key: str, lock_key: str, token: str, timeout_ms: int):
+    "Try to take the rebuild lock of an entry and read it; returns (locked, data)"
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(lock_key, token, nx=True, px=timeout_ms)
+        pipe.get(key)
+        locked, data = await pipe.execute()
+    return bool(locked), data
+
+
+async def set_and_unlock(redis: aioredis.Redis, key: str, data: bytes, ex: int, lock_key: str, token: str):
+    "Write an entry and release its rebuild lock if it is still ours"
+    await SET_AND_UNLOCK_SCRIPT(keys=[key, lock_key], args=[data, ex, token], client=redis)
+
+
+async def unlock(redis: aioredis.Redis, lock_key: str, token: str):
+    "Release a rebuild lock if it is still ours"
+    await UNLOCK_SCRIPT(keys=[lock_key], args=[token], client=redis)
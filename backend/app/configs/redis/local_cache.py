@@ -0,0 +1,116 @@
+"""
+In-process Cache Module
+
+A memory-bounded LRU with TTL that sits in front of Redis in every worker.
+Entries are keyed by versioned cache keys, so they go stale as soon as a tag
+version changes. Workers learn new tag versions from the Redis invalidation
+channel and only trust their local tag versions while subscribed to it.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+import orjson
+import redis.asyncio as aioredis # type: ignore
+
+load_dotenv(dotenv_path="app/.env")
+
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+LOCAL_CACHE_TTL = int(os.getenv("LOCAL_CACHE_TTL", 60))
+INVALIDATION_CHANNEL = "cache-invalidation"
+RECONNECT_INTERVAL = 1
+
+
+class LocalCache:
+    """
+    LRU cache of entries bounded by the size of their serialized form.
+
+    Attributes:
+        max_bytes (int): Upper bound of the summed payload sizes.
+        ttl (int): Upper bound of the lifetime of an entry in seconds.
+        coherent (bool): Whether the worker is subscribed to the invalidation channel.
+        generation (int): Incremented whenever the tag versions are reset.
+    """
+    def __init__(self, max_bytes=LOCAL_CACHE_MAX_BYTES, ttl=LOCAL_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.tag_versions = {}
+        self.coherent = False
+        self.generation = 0
+
+    def get(self, key):
+        "Return the value of a live entry, or None"
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self.evict(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, size, ttl=None):
+        "Store a value and evict the least recently used entries above the size bound"
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.evict(key)
+        ttl = min(ttl or self.ttl, self.ttl)
+        self.entries[key] = (time.monotonic() + ttl, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            self.evict(next(iter(self.entries)))
+
+    def evict(self, key):
+        "Remove an entry"
+        _, size, _ = self.entries.pop(key)
+        self.size -= size
+
+    def get_versions(self, tags):
+        "Return the local versions of the tags, or None if any of them cannot be trusted"
+        if not self.coherent or any(tag not in self.tag_versions for tag in tags):
+            return None
+        return [self.tag_versions[tag] for tag in tags]
+
+    def update_versions(self, versions, generation=None):
+        "Merge tag versions; versions only grow, so late or reordered updates are harmless"
+        if not self.coherent or (generation is not None and generation != self.generation):
+            return
+        for tag, version in versions.items():
+            self.tag_versions[tag] = max(self.tag_versions.get(tag, 0), int(version))
+
+    def reset(self, coherent=False):
+        "Drop every entry and tag version"
+        self.entries.clear()
+        self.size = 0
+        self.tag_versions.clear()
+        self.coherent = coherent
+        self.generation += 1
+
+
+local_cache = LocalCache()
+
+
+async def listen_for_invalidations(redis: aioredis.Redis):
+    "Keep the local tag versions in sync with the invalidation channel"
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    local_cache.reset(coherent=True)
+                elif message["type"] == "message":
+                    local_cache.update_versions(orjson.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Cache invalidation listener disconnected: {e}")
+        finally:
+            local_cache.reset()
+            await pubsub.aclose()
+        await asyncio.sleep(RECONNECT_INTERVAL)
@@ -0,0 +1,39 @@
+"""
+Cache Metrics Module
+
+Prometheus metrics of the cache layer, labelled by key family (the first part of
+a cache key: leads, calls, pocs, interactions, performance). They are registered
+in the default registry and therefore served by the Instrumentator metrics endpoint.
+"""
+from prometheus_client import Counter, Histogram # type: ignore
+
+ENTRY_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CACHE_HITS = Counter(
+    "cache_hits_total", "Cache lookups served from a cached entry", ["family", "tier"]
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total", "Cache lookups that found no entry", ["family"]
+)
+CACHE_STALE_HITS = Counter(
+    "cache_stale_hits_total", "Stale entries served while being refreshed in the background", ["family"]
+)
+CACHE_REBUILD_SECONDS = Histogram(
+    "cache_rebuild_duration_seconds", "Time spent building cache entries", ["family"]
+)
+CACHE_ENTRY_BYTES = Histogram(
+    "cache_entry_bytes", "Size of the cache entries written to Redis", ["family"], buckets=ENTRY_SIZE_BUCKETS
+)
+CACHE_INVALIDATIONS = Counter(
+    "cache_invalidations_total", "Tag invalidations", ["family"]
+)
+
+
+# Record tags (`lead:7`) are labelled with the family of the entries they belong to
+RECORD_FAMILIES = {"lead": "leads"}
+
+
+def key_family(key: str):
+    "Family of a cache key or tag (`calls:all:calls@3` -> `calls`, `lead:7` -> `leads`)"
+    family = key.partition(":")[0]
+    return RECORD_FAMILIES.get(family, family)
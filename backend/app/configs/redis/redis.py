@@ -10,10 +10,10 @@ load_dotenv(dotenv_path="app/.env")
 
 host = os.getenv("REDIS_HOST")
 
-"Create Redis connection pool"
+"Create Redis connection pool (raw bytes: cached payloads are served without decoding)"
 redis_client = aioredis.from_url(
   host,
-  decode_responses=True
+  decode_responses=False
 )
 async def get_redis_client():
     "Initialize redis client"
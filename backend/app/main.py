@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.status import HTTP_404_NOT_FOUND, HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
@@ -10,6 +12,12 @@ from .routes.call_tracking_routes import router as call_tracking_router
 from .routes.interaction_tracking_routes import router as interaction_tracking_router
 from .routes.performance_tracking_routes import router as performance_tracking_router
 from .routes.user_routes import router as user_router
+from .routes.export_routes import router as export_router
+from .configs.redis.redis import redis_client
+from .configs.redis.local_cache import listen_for_invalidations
+from .configs.database.postgres_db import async_engine, read_engine
+from .configs.database.mongo_db import mongo_db
+from .services.performance_service import create_rollup_indexes
 
 from app.exceptions.exception_handler import (
     not_found_error_handler,
@@ -19,14 +27,28 @@ from app.exceptions.exception_handler import (
 )
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Keep the in-process cache of this worker coherent while the app is running
+    and make sure the interactions and the performance rollups are indexed"""
+    listener = asyncio.create_task(listen_for_invalidations(redis_client))
+    indexing = asyncio.gather(mongo_db.create_indexes(), create_rollup_indexes())
+    yield
+    indexing.cancel()
+    listener.cancel()
+    await async_engine.dispose()
+    await read_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Cache", "Age"]
 )
 # Registering custom exception handlers
 app.add_exception_handler(HTTP_404_NOT_FOUND, not_found_error_handler)
@@ -41,6 +63,7 @@ app.include_router(point_of_contact_router, prefix="/api/lead", tags=["Point of
 app.include_router(call_tracking_router, prefix="/api", tags=["Call Tracking Operations"])
 app.include_router(interaction_tracking_router, prefix="/api", tags=["Interaction Tracking Operations"])
 app.include_router(performance_tracking_router, prefix="/api/performance", tags=["Performance Tracking Operations"])
+app.include_router(export_router, prefix="/api/export", tags=["Export Operations"])
 
 # Initialize Prometheus monitoring
 instrumentator = Instrumentator().instrument(app)
@@ -1,7 +1,7 @@
 "Model Configuration Module for Postgres DB"
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Time
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Time, Index
 from sqlalchemy.orm import relationship
 from ..configs.database.postgres_db import Base
 
@@ -46,8 +46,18 @@ class LeadModel(Base):
     """
 
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_status_id", "status", "id"),
+        Index("ix_leads_country_id", "country", "id"),
+        # Trigram index serving the prefix (ILIKE 'q%'), substring and similarity
+        # searches on lead names; needs the pg_trgm extension, so Postgres only
+        Index(
+            "ix_leads_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
     address = Column(String, nullable=False)
     zipcode = Column(String, nullable=False)
     state = Column(String, nullable=False)
@@ -77,7 +87,7 @@ class PointOfContactModel(Base):
 
     __tablename__ = "point_of_contacts"
     id = Column(Integer, primary_key=True, index=True)
-    lead_id = Column(Integer, ForeignKey("leads.id"))
+    lead_id = Column(Integer, ForeignKey("leads.id"), index=True)
     name = Column(String, nullable=False)
     role = Column(String, nullable=False)
     email = Column(String)
@@ -114,7 +124,7 @@ class CallModel(Base):
     __tablename__ = "calls_tracking"
     id = Column(Integer, primary_key=True, index=True)
     poc_id = Column(Integer, ForeignKey("point_of_contacts.id"))
-    lead_id = Column(Integer, ForeignKey("leads.id"))
+    lead_id = Column(Integer, ForeignKey("leads.id"), index=True)
     
     frequency = Column(Integer)
     last_call_date = Column(DateTime, default=None, nullable=True)
@@ -122,4 +132,33 @@ class CallModel(Base):
     next_call_time = Column(Time, default=None, nullable=False)
 
     lead = relationship("LeadModel", back_populates="calls")
-    poc = relationship("PointOfContactModel", back_populates="calls")
\ No newline at end of file
+    poc = relationship("PointOfContactModel", back_populates="calls")
+
+class CallAgendaModel(Base):
+    """
+    CallAgendaModel is the materialized agenda of the scheduled calls: one row per
+    call, denormalized so that an agenda is served by a single indexed range read.
+    Attributes:
+        call_id (int): The call of the row, deleted along with it.
+        lead_id (int): The lead called.
+        poc_id (int): The point of contact called.
+        lead_name (str): Name of the lead.
+        poc_name (str): Name of the point of contact.
+        poc_contact (str): Phone number of the point of contact.
+        frequency (int): The frequency of the call, in days.
+        next_call_date (date): Date of the next call, in IST.
+        next_call_time (time): Time of the next call, in IST.
+        scheduled_at (datetime): Instant of the next call, in UTC.
+    """
+
+    __tablename__ = "call_agenda"
+    call_id = Column(Integer, ForeignKey("calls_tracking.id", ondelete="CASCADE"), primary_key=True)
+    lead_id = Column(Integer, nullable=False, index=True)
+    poc_id = Column(Integer, nullable=False, index=True)
+    lead_name = Column(String, nullable=False)
+    poc_name = Column(String, nullable=False)
+    poc_contact = Column(String, nullable=False)
+    frequency = Column(Integer)
+    next_call_date = Column(Date, nullable=False)
+    next_call_time = Column(Time, nullable=False)
+    scheduled_at = Column(DateTime, nullable=False, index=True)
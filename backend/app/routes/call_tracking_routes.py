@@ -1,21 +1,23 @@
 """This module contains routes for call tracking."""
-import json
 import redis.asyncio as aioredis # type: ignore
-from typing import List
+from datetime import date, datetime
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..utils.utils import has_permission, json_serializer
-from ..configs.database.postgres_db import get_postgres_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..utils.utils import has_permission
+from ..configs.database.postgres_db import get_async_postgres_db
 from ..configs.redis.redis import get_redis_client
-from ..schemas.postgres_schemas import CallCreate, CallUpdate, CallTodayResponse, CallResponse
+from ..configs.redis.cache import cached, invalidate, CALLS_TAG
+from ..schemas.postgres_schemas import CallCreate, CallUpdate, CallTodayResponse, CallAgendaResponse, CallResponse
 from ..services.call_tracking_service import (
     add_call_to_lead,
+    add_calls_to_leads,
     update_frequency,
     update_log,
-    get_calls_today,
     get_all_calls,
     delete_call_with_id
 )
+from ..services.call_agenda_service import agenda_timezone, get_agenda, DEFAULT_AGENDA_TIMEZONE
 
 router = APIRouter()
 
@@ -23,15 +25,35 @@ router = APIRouter()
 async def add_call(
     lead_id: int,
     call: CallCreate,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "admin"])
     ):
     """Route to add a call to a lead."""
     try:
-        cached_keys = ["calls-all", "calls-today"]
-        [await redis.delete(key) for key in cached_keys]
-        return add_call_to_lead(lead_id, call, db)
+        db_call = await add_call_to_lead(lead_id, call, db, redis)
+        await invalidate(redis, CALLS_TAG)
+        return db_call
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+
+
+@router.post('/calls/bulk', response_model=List[CallTodayResponse])
+async def add_calls(
+    calls: List[CallCreate],
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
+    permissions: bool = has_permission(["sales", "admin"])
+    ):
+    """Route to schedule calls with many lead/POC pairs at once."""
+    try:
+        db_calls = await add_calls_to_leads(calls, db)
+        await invalidate(redis, CALLS_TAG)
+        return db_calls
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -41,15 +63,17 @@ async def update_call_frequency(
     lead_id: int,
     call_id: int,
     call: CallUpdate,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "admin"])
     ):
     """Route to update the frequency of a call."""
     try:
-        cached_keys = ["calls-all", "calls-today"]
-        [await redis.delete(key) for key in cached_keys]
-        return update_frequency(call_id, lead_id, call, db)
+        db_call = await update_frequency(call_id, lead_id, call, db)
+        await invalidate(redis, CALLS_TAG)
+        return db_call
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -58,81 +82,90 @@ async def update_call_frequency(
 async def update_call_log(
     lead_id:int,
     call_id:int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "admin"])
     ):
     """Route to update the call log."""
     try:
-        cached_keys = ["calls-all", "calls-today"]
-        [await redis.delete(key) for key in cached_keys]
-        return update_log(call_id, lead_id, db)
+        db_call = await update_log(call_id, lead_id, db)
+        await invalidate(redis, CALLS_TAG)
+        return db_call
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
 @router.get('/calls', response_model=List[CallTodayResponse])
 async def calls(
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", 'viewer', 'admin'])
     ):
     """Route to retrieve all calls."""
     try:
-        cached_key = "calls-all"
-        calls_data_redis = await redis.get(cached_key)
-        if calls_data_redis:
-            return json.loads(calls_data_redis)
-        calls = get_all_calls(db)
-        calls_data_db = [
-            CallTodayResponse(
-                id=call.id,
-                lead_id=call.lead_id,
-                poc_id=call.poc_id,
-                lead_name=call.lead.name,
-                poc_name=call.poc.name,
-                frequency=call.frequency,
-                poc_contact=call.poc.phone_number,
-                next_call_date=call.next_call_date,
-                next_call_time=call.next_call_time
-            ).model_dump()
-            for call in calls
-        ]
-        await redis.set(cached_key, json.dumps(calls_data_db, default=json_serializer), ex=3600)
-        return calls_data_db
+        async def build():
+            calls = await get_all_calls(db)
+            return [
+                CallTodayResponse(
+                    id=call.id,
+                    lead_id=call.lead_id,
+                    poc_id=call.poc_id,
+                    lead_name=call.lead.name,
+                    poc_name=call.poc.name,
+                    frequency=call.frequency,
+                    poc_contact=call.poc.phone_number,
+                    next_call_date=call.next_call_date,
+                    next_call_time=call.next_call_time
+                ).model_dump()
+                for call in calls
+            ]
+        return await cached(redis, "calls", [CALLS_TAG], ("all",), build, ex=3600)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
-@router.get('/calls/today', response_model=List[CallTodayResponse])
+async def agenda_response(day: Optional[date], timezone: str, db: AsyncSession, redis: aioredis.Redis):
+    """Cached agenda of a day (today by default) in a timezone."""
+    day = day or datetime.now(agenda_timezone(timezone)).date()
+    async def build():
+        calls = await get_agenda(day, timezone, db)
+        return [CallAgendaResponse(**call).model_dump() for call in calls]
+    return await cached(redis, "calls", [CALLS_TAG], ("agenda", day, timezone), build, ex=3600)
+
+
+@router.get('/calls/today', response_model=List[CallAgendaResponse])
 async def calls_today(
-    db: Session = Depends(get_postgres_db),
+    timezone: str = DEFAULT_AGENDA_TIMEZONE,
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
+    permissions: bool = has_permission(["sales", 'viewer', 'admin'])
+    ):
+    """Route to retrieve all calls scheduled for today in a timezone (IST by default)."""
+    try:
+        return await agenda_response(None, timezone, db, redis)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+
+
+@router.get('/calls/agenda', response_model=List[CallAgendaResponse])
+async def calls_agenda(
+    day: Optional[date] = None,
+    timezone: str = DEFAULT_AGENDA_TIMEZONE,
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", 'viewer', 'admin'])
     ):
-    """Route to retrieve all calls scheduled for today."""
+    """Route to retrieve the calls scheduled on a day (today by default) in a timezone (IST by default)."""
     try:
-        cached_key = "calls-today"
-        calls_data_redis_today = await redis.get(cached_key)
-        if calls_data_redis_today:
-            return json.loads(calls_data_redis_today)
-        calls = get_calls_today(db)
-        calls_data_db_today = [
-            CallTodayResponse(
-                id=call.id,
-                lead_id=call.lead_id,
-                poc_id=call.poc_id,
-                lead_name=call.lead.name,
-                poc_name=call.poc.name,
-                frequency=call.frequency,
-                poc_contact=call.poc.phone_number,
-                next_call_date=call.next_call_date,
-                next_call_time=call.next_call_time
-            ).model_dump()
-            for call in calls
-        ]
-        await redis.set(cached_key, json.dumps(calls_data_db_today, default=json_serializer), ex=3600)
-        return calls_data_db_today
+        return await agenda_response(day, timezone, db, redis)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -140,14 +173,16 @@ async def calls_today(
 @router.delete('/lead/{lead_id}/call/{call_id}')
 async def delete_call(
     call_id: int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(['admin'])
     ):
     """Route to delete a call by ID."""
     try:
-        cached_key = "calls-all"
-        await redis.delete(cached_key)
-        return delete_call_with_id(call_id, db)
+        response = await delete_call_with_id(call_id, db)
+        await invalidate(redis, CALLS_TAG)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
@@ -0,0 +1,44 @@
+"""This module contains the routes for exporting data."""
+
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from ..utils.utils import has_permission
+from ..services.export_service import (
+    export_interactions,
+    export_table,
+    interaction_export_query,
+    EXPORT_MEDIA_TYPES
+)
+
+router = APIRouter()
+
+@router.get('/interactions')
+async def export_all_interactions(
+    lead_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    permissions: bool = has_permission(["admin"])
+    ):
+    """Route to stream the interactions, optionally of a lead and/or between two dates, as NDJSON."""
+    query = interaction_export_query(lead_id, start_date, end_date)
+    return StreamingResponse(
+        export_interactions(query),
+        media_type=EXPORT_MEDIA_TYPES["ndjson"],
+        headers={"Content-Disposition": 'attachment; filename="interactions.ndjson"'}
+    )
+
+
+@router.get('/{entity}')
+async def export(
+    entity: Literal["leads", "pocs", "calls"],
+    file_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    permissions: bool = has_permission(["admin"])
+    ):
+    """Route to stream a full export of leads, points of contact or calls as NDJSON or CSV."""
+    return StreamingResponse(
+        export_table(entity, file_format),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{file_format}"'}
+    )
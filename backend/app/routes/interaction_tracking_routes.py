@@ -1,20 +1,34 @@
 """This module contains routes for interaction tracking."""
 
-import json
 import os
 import redis.asyncio as aioredis # type: ignore
 from dotenv import load_dotenv
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from pymongo import ReturnDocument
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from ..utils.utils import has_permission, json_serializer
+from ..utils.utils import has_permission
 from ..models.postgres_models import LeadModel
 from ..models.mongo_models import InteractionResponse, NewInteraction
 from ..configs.database.mongo_db import mongo_db
 from ..configs.redis.redis import get_redis_client
-from ..configs.database.postgres_db import get_postgres_db
+from ..configs.redis.cache import (
+    Payload,
+    cached,
+    invalidate,
+    lead_tag,
+    LEADS_TAG,
+    INTERACTIONS_TAG,
+    PERFORMANCE_TAG
+)
+from ..configs.database.postgres_db import get_async_postgres_db
+from ..services.lead_service import get_lead_summary, lead_summary_record
+from ..services.performance_service import add_to_rollup, remove_from_rollup
+from ..services.interaction_service import get_interactions_page, get_lead_names
 
 load_dotenv(dotenv_path="app/.env")
 
@@ -25,92 +39,110 @@ collection = mongo_db.get_collection()
 
 router = APIRouter()
 
+
+async def get_lead_name(lead_id: int, db: AsyncSession, redis: aioredis.Redis, default: str):
+    """Name of a lead from its cached summary, or `default` if the lead does not exist."""
+    try:
+        return (await get_lead_summary(lead_id, db, redis))["name"]
+    except HTTPException:
+        return default
+
+
 @router.post('/interactions/{lead_id}', response_model=InteractionResponse)
 async def add_interaction(
     lead_id: int, 
     interaction: NewInteraction, 
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "admin"])
     ):
     """Route to add an interaction to a lead."""
     try:
         interaction = interaction.model_dump()
-        db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-        if not db_lead:
-            raise HTTPException(status_code=404, detail="Lead not found")
+        lead = await get_lead_summary(lead_id, db, redis)
         interaction["lead_id"] = lead_id
-        interaction
+        interaction["interaction_at"] = datetime.combine(
+            interaction["interaction_date"], interaction["interaction_time"]
+        ).replace(microsecond=0)
         interaction["interaction_date"] = interaction["interaction_date"].strftime("%Y-%m-%d")
         interaction["interaction_time"] = interaction["interaction_time"].strftime('%H:%M:%S')
         if interaction.get("order"):
             for order_item in interaction["order"]:
                 if not order_item.get("price") or not order_item.get("quantity"):
                     raise HTTPException(status_code=400, detail="Price and quantity are required for each order item")
-            db_lead.status = "converted"
-            db.commit()
-            db.refresh(db_lead)
+            lead["status"] = "converted"
         else:
             interaction["order"] = []
-            db_lead.status = "contacted"
-            db.commit()
-            db.refresh(db_lead)
+            lead["status"] = "contacted"
+        await db.execute(update(LeadModel).where(LeadModel.id == lead_id).values(status=lead["status"]))
+        await db.commit()
         await collection.insert_one(interaction)
+        await add_to_rollup(interaction)
         interaction['id'] = str(interaction["_id"])
-        interaction["lead_name"] = db_lead.name
-        cached_keys = ["interactions-all", "well-performing", "under-performing"]
-        [await redis.delete(key) for key in cached_keys]
+        interaction["lead_name"] = lead["name"]
+        await invalidate(
+            redis, INTERACTIONS_TAG, PERFORMANCE_TAG, LEADS_TAG, lead_tag(lead_id),
+            records=lead_summary_record(lead_id, lead)
+        )
         return interaction
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"An error occurred: {e}") from e
 
 
+def interactions_payload(interactions, lead_names: dict, default: str, next_cursor):
+    """Page of interactions with their lead names, and the cursor of the next page in X-Next-Cursor."""
+    result = []
+    for interaction in interactions:
+        interaction['id'] = str(interaction["_id"])
+        interaction["lead_name"] = lead_names.get(interaction["lead_id"], default)
+        result.append(InteractionResponse.model_validate(interaction).model_dump())
+    return Payload(result, {"X-Next-Cursor": next_cursor} if next_cursor else {})
+
+
 @router.get('/interactions/{lead_id}', response_model=List[InteractionResponse])
 async def get_interactions(
     lead_id: int, 
-    db: Session = Depends(get_postgres_db), 
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_postgres_db), 
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "viewer", "admin"])
     ):
-    """Route to retrieve all interactions for a specific lead."""
+    """Route to retrieve a page of the interactions of a specific lead, most recent first.
+    The cursor of the next page is returned in the X-Next-Cursor header."""
     try:
-        cached_key = f"interactions-{lead_id}"
-        interactions_data_cache = await redis.get(cached_key)
-        if interactions_data_cache:
-            return json.loads(interactions_data_cache)
-        interactions = await collection.find({"lead_id": lead_id}).sort([('interaction_date',-1),('interaction_time',-1)]).to_list(length=1000)
-        await redis.set(cached_key, json.dumps(interactions, default=json_serializer), ex=180)
-        return interactions
+        async def build():
+            interactions, next_cursor = await get_interactions_page({"lead_id": lead_id}, cursor, limit)
+            lead_name = await get_lead_name(lead_id, db, redis, "Unknown")
+            return interactions_payload(interactions, {lead_id: lead_name}, "Unknown", next_cursor)
+        return await cached(redis, "interactions", [lead_tag(lead_id)], (lead_id, cursor, limit), build, ex=180)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}") from e
 
 
 @router.get('/interactions', response_model=List[InteractionResponse])
 async def get_all_interactions(
-    db: Session = Depends(get_postgres_db), 
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_postgres_db), 
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "viewer", "admin"])
     ):
-    """Route to retrieve all interactions."""
+    """Route to retrieve a page of all interactions, most recent first.
+    The cursor of the next page is returned in the X-Next-Cursor header."""
     try:
-        cached_key = "interactions-all"
-        interactions_data_cache = await redis.get(cached_key)
-        if interactions_data_cache:
-            return json.loads(interactions_data_cache)
-        interactions = await collection.find({}).sort([('interaction_date',-1),('interaction_time',-1)]).to_list(length=1000)
-        lead_ids = [interaction['lead_id'] for interaction in interactions]
-        leads = db.query(LeadModel).filter(LeadModel.id.in_(lead_ids)).all()
-        lead_dict = {lead.id: lead.name for lead in leads}
-        result = []
-        for interaction in interactions:
-            interaction['id'] = str(interaction["_id"])
-            interaction["lead_name"] = lead_dict.get(interaction["lead_id"], "Unknown")
-            result.append(interaction)
-        await redis.set(cached_key, json.dumps(result, default=json_serializer), ex=180)
-        return result
+        async def build():
+            interactions, next_cursor = await get_interactions_page({}, cursor, limit)
+            lead_names = await get_lead_names([interaction["lead_id"] for interaction in interactions], db)
+            return interactions_payload(interactions, lead_names, "Unknown", next_cursor)
+        return await cached(redis, "interactions", [INTERACTIONS_TAG], ("all", cursor, limit), build, ex=180)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}") from e
 
@@ -120,29 +152,36 @@ async def update_interaction(
     lead_id: str, 
     interaction_id: str, 
     interaction: NewInteraction,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", "admin"])
     ):
     """Route to update an interaction by ID."""
     interaction = interaction.model_dump()
     try:
+        interaction["interaction_at"] = datetime.combine(
+            interaction["interaction_date"], interaction["interaction_time"]
+        ).replace(microsecond=0)
         interaction["interaction_date"] = interaction["interaction_date"].strftime("%Y-%m-%d")
         interaction["interaction_time"] = interaction["interaction_time"].strftime('%H:%M:%S')
-        result = await collection.update_one({"_id": ObjectId(interaction_id)}, {"$set": interaction})
-        if result.modified_count == 1:
-            updated_interaction = await collection.find_one({"_id": ObjectId(interaction_id)})
+        previous_interaction = await collection.find_one_and_update(
+            {"_id": ObjectId(interaction_id)}, {"$set": interaction}, return_document=ReturnDocument.BEFORE
+        )
+        if previous_interaction:
+            updated_interaction = {**previous_interaction, **interaction}
+            await add_to_rollup(updated_interaction)
+            await remove_from_rollup(previous_interaction)
             updated_interaction['id'] = str(updated_interaction["_id"])
-            db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-            if db_lead:
-                updated_interaction["lead_name"] = db_lead.name
-            else:
-                updated_interaction["lead_name"] = "Unknown Lead"
-            updated_interaction["id"] = str(updated_interaction["_id"])
-            cached_keys = ["interactions-all", f"interactions-{lead_id}", "well-performing", "under-performing"]
-            [await redis.delete(key) for key in cached_keys]
+            updated_interaction["lead_name"] = await get_lead_name(updated_interaction["lead_id"], db, redis, "Unknown Lead")
+            # The update may move the interaction to another lead: both leads' entries change
+            await invalidate(
+                redis, INTERACTIONS_TAG, PERFORMANCE_TAG,
+                lead_tag(previous_interaction["lead_id"]), lead_tag(updated_interaction["lead_id"])
+            )
             return updated_interaction
         raise HTTPException(status_code=404, detail="Interaction not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"An error occurred: {e}") from e
 
@@ -155,11 +194,13 @@ async def delete_interaction(
     ):
     """Route to delete an interaction by ID."""
     try:
-        result = await collection.delete_one({"_id": ObjectId(interaction_id)})
-        if result.deleted_count == 1:
-            cached_keys = ["interactions-all", "well-performing", "under-performing"]
-            [await redis.delete(key) for key in cached_keys]
+        deleted_interaction = await collection.find_one_and_delete({"_id": ObjectId(interaction_id)})
+        if deleted_interaction:
+            await remove_from_rollup(deleted_interaction)
+            await invalidate(redis, INTERACTIONS_TAG, PERFORMANCE_TAG, lead_tag(deleted_interaction["lead_id"]))
             return {"status": "success", "message": "Interaction deleted"}
         raise HTTPException(status_code=404, detail="Interaction not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"An error occurred: {e}") from e
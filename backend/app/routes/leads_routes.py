@@ -1,21 +1,25 @@
 """This module contains routes for leads."""
 
-import json
 import redis.asyncio as aioredis # type: ignore
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from ..models.postgres_models import LeadModel
 from ..configs.redis.redis import get_redis_client
-from ..configs.database.postgres_db import get_postgres_db
+from ..configs.redis.cache import Payload, cached, invalidate, lead_tag, LEADS_TAG, CALLS_TAG, INTERACTIONS_TAG, PERFORMANCE_TAG
+from ..configs.database.postgres_db import get_async_postgres_db
 from ..schemas.postgres_schemas import Lead, LeadResponse, LeadCreateUpdate
-from ..utils.utils import has_permission, json_serializer
+from ..utils.utils import has_permission, iter_lines
 from ..services.lead_service import (
     create_new_lead, 
-    get_lead_by_id, 
+    get_lead_summary, 
+    lead_summary_record, 
+    to_lead_summary, 
+    get_leads_page, 
+    search_leads,
     update_lead_by_id, 
-    delete_lead_by_id
+    delete_lead_by_id,
+    import_leads
 )
 
 router = APIRouter()
@@ -23,36 +27,95 @@ router = APIRouter()
 @router.post('/', response_model=LeadResponse)
 async def create_lead(
     lead: LeadCreateUpdate,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales","admin"])
     ):
     """Route to create a new lead."""
     try:
-        return create_new_lead(lead, db)
-        
+        db_lead = await create_new_lead(lead, db)
+        await invalidate(redis, LEADS_TAG, records=lead_summary_record(db_lead.id, to_lead_summary(db_lead)))
+        return db_lead
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+
+
+@router.post('/import')
+async def bulk_import_leads(
+    request: Request,
+    file_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
+    permissions: bool = has_permission(["sales", "admin"])
+    ):
+    """Route to import leads from a CSV (with a header line) or NDJSON request body.
+    The body is streamed and imported in chunks; the response reports every rejected row."""
+    try:
+        return await import_leads(iter_lines(request.stream()), file_format, db, redis)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
 @router.get('/', response_model=List[LeadResponse])
 async def get_all_leads(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_postgres_db),
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    status: Optional[str] = None,
+    country: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
+    permissions: bool = has_permission(["admin", 'sales', 'viewer'])
+    ):
+    """Route to retrieve a page of leads after the `cursor` lead ID.
+    The cursor of the next page is returned in the X-Next-Cursor header."""
+    try:
+        async def build():
+            leads, next_cursor = await get_leads_page(db, cursor, limit, status, country)
+            headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else {}
+            return Payload([LeadResponse.model_validate(lead).model_dump() for lead in leads], headers)
+        return await cached(redis, "leads", [LEADS_TAG], (cursor, limit, status, country), build, ex=300)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+
+
+@router.get('/search', response_model=List[LeadResponse])
+async def search_all_leads(
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    mode: Literal["prefix", "fuzzy"] = "prefix",
+    status: Optional[str] = None,
+    country: Optional[str] = None,
+    state: Optional[str] = None,
+    timezone: Optional[str] = None,
+    area_of_interest: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["admin", 'sales', 'viewer'])
     ):
-    """Route to retrieve all leads."""
+    """Route to search leads by name (`prefix` or `fuzzy`) and filter them.
+    The offset of the next page is returned in the X-Next-Offset header."""
     try:
-        cache_key = "leads-all"
-        leads_data = await redis.get(cache_key)
-        if leads_data:
-            return json.loads(leads_data)
-        leads =  db.query(LeadModel).offset(skip).limit(limit).all()
-        leads_data = [LeadResponse.model_validate(lead).model_dump() for lead in leads]
-        await redis.set(cache_key, json.dumps(leads_data, default=json_serializer), ex=300)
-        return leads_data
+        filters = {
+            "status": status, "country": country, "state": state,
+            "timezone": timezone, "area_of_interest": area_of_interest
+        }
+        async def build():
+            leads, next_offset = await search_leads(db, q, mode, filters, offset, limit)
+            headers = {"X-Next-Offset": str(next_offset)} if next_offset is not None else {}
+            return Payload([LeadResponse.model_validate(lead).model_dump() for lead in leads], headers)
+        parts = ("search", q, mode, *filters.values(), offset, limit)
+        return await cached(redis, "leads", [LEADS_TAG], parts, build, ex=300)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -60,12 +123,15 @@ async def get_all_leads(
 @router.get('/{lead_id}', response_model=Lead)
 async def get_lead(
     lead_id: int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
+    redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["admin", 'sales', 'viewer'])
     ):
     """Route to retrieve a lead by its ID."""
     try:
-        return get_lead_by_id(lead_id, db)
+        return await get_lead_summary(lead_id, db, redis)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -74,15 +140,20 @@ async def get_lead(
 async def update_lead(
     lead_id: int,
     lead: LeadCreateUpdate,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission("admin")
     ):
     """Route to update a lead by its ID."""
     try:
-        cached_key = "leads-all"
-        await redis.delete(cached_key)
-        return update_lead_by_id(lead_id, lead, db)
+        db_lead = await update_lead_by_id(lead_id, lead, db)
+        await invalidate(
+            redis, LEADS_TAG, lead_tag(lead_id), CALLS_TAG, INTERACTIONS_TAG, PERFORMANCE_TAG,
+            records=lead_summary_record(lead_id, to_lead_summary(db_lead))
+        )
+        return db_lead
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -90,14 +161,19 @@ async def update_lead(
 @router.delete('/{lead_id}')
 async def delete_lead(
     lead_id: int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission("admin")
     ):
     """Route to delete a lead by its ID."""
     try:
-        cached_key = "leads-all"
-        await redis.delete(cached_key)
-        return delete_lead_by_id(lead_id, db)
+        response = await delete_lead_by_id(lead_id, db)
+        await invalidate(
+            redis, LEADS_TAG, lead_tag(lead_id), CALLS_TAG, INTERACTIONS_TAG, PERFORMANCE_TAG,
+            records=lead_summary_record(lead_id)
+        )
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
@@ -1,58 +1,62 @@
 """This module defines the routes for performance tracking."""
 
-import json
 import redis.asyncio as aioredis # type: ignore
-from typing import List
-from fastapi import APIRouter,Depends
-from sqlalchemy.orm import Session
-from ..utils.utils import has_permission, json_serializer
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends
+from ..utils.utils import has_permission
 from ..models.mongo_models import Performance
-from ..configs.database.postgres_db import get_postgres_db
 from ..configs.redis.redis import get_redis_client
-from ..services.performance_service import get_performance_data
-from ..services.performance_service_pipeline import (
-    well_performing_pipeline,
-    under_performing_pipeline,
-    total_data_pipeline
-)
+from ..configs.redis.cache import cached_with_freshness, PERFORMANCE_TAG
+from ..services.performance_service import get_detached_performance_data, performance_period
+
+# Performance data is served from cache for up to an hour and read again from the
+# rollups in the background once it is older than five minutes.
+PERFORMANCE_STALE_AFTER = 300
+PERFORMANCE_TTL = 3600
 
 router = APIRouter()
 
+def requested_period(
+    window: Literal["7d", "30d", "90d", "all"] = "30d",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+    ):
+    """Period of a performance request: a rolling window ending today, or an explicit
+    date range (inclusive) which takes precedence over the window."""
+    return performance_period(window, start_date, end_date)
+
+async def cached_performance(redis: aioredis.Redis, view: str, limit: int, period):
+    """Retrieve cached performance data, reporting its freshness in the response headers."""
+    return await cached_with_freshness(
+        redis, "performance", [PERFORMANCE_TAG], (view, *(period or ("all",))),
+        lambda: get_detached_performance_data(view, limit, period),
+        stale_after=PERFORMANCE_STALE_AFTER, ex=PERFORMANCE_TTL
+    )
+
 @router.get('/well-performing', response_model=List[Performance])
 async def well_performance(
     permissions: bool = has_permission(["sales", "viewer", "admin"]),
-    db: Session = Depends(get_postgres_db),
-    redis: aioredis.Redis = Depends(get_redis_client)
+    redis: aioredis.Redis = Depends(get_redis_client),
+    period = Depends(requested_period)
     ):
-    """Route to retrieve the top 5 well-performing sales leads"""
-    cache_key = "well-performing"
-    performance_data_cache = await redis.get(cache_key)
-    if performance_data_cache:
-        return json.loads(performance_data_cache)
-    
-    performance_data_db = await get_performance_data(well_performing_pipeline, db, limit=5)
-    await redis.set(cache_key, json.dumps(performance_data_db, default=json_serializer))
-    return performance_data_db
+    """Route to retrieve the top 5 well-performing sales leads over a period"""
+    return await cached_performance(redis, "well", limit=5, period=period)
 
 @router.get('/', response_model=List[dict])
 async def performance(
     permissions: bool = has_permission(["sales", "viewer", "admin"]),
-    db: Session = Depends(get_postgres_db)
+    redis: aioredis.Redis = Depends(get_redis_client),
+    period = Depends(requested_period)
     ):
-    """Route to retrieve the performance data for all sales leads."""
-    return await get_performance_data(total_data_pipeline, db, limit=100)
+    """Route to retrieve the performance data for all sales leads over a period."""
+    return await cached_performance(redis, "total", limit=100, period=period)
 
 @router.get('/under-performing', response_model=List[Performance])
 async def under_performance(
     permissions: bool = has_permission(["sales", "viewer", "admin"]),
-    db: Session = Depends(get_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
+    period = Depends(requested_period)
     ):
-    """Route to retrieve the top 5 under-performing sales leads."""
-    cache_key = "under-performing"
-    performance_data_cache = await redis.get(cache_key)
-    if performance_data_cache:
-        return json.loads(performance_data_cache)
-    performance_data_db = await get_performance_data(under_performing_pipeline, db, limit=5)
-    await redis.set(cache_key, json.dumps(performance_data_db, default=json_serializer))
-    return performance_data_db
\ No newline at end of file
+    """Route to retrieve the top 5 under-performing sales leads over a period."""
+    return await cached_performance(redis, "under", limit=5, period=period)
@@ -1,17 +1,18 @@
 """This module contains the routes for the point of contact endpoints."""
-import json
 import redis.asyncio as aioredis # type: ignore
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..configs.database.postgres_db import get_postgres_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..configs.database.postgres_db import get_async_postgres_db
 from ..configs.redis.redis import get_redis_client
+from ..configs.redis.cache import cached, invalidate, lead_tag, POCS_TAG, CALLS_TAG
 from ..schemas.postgres_schemas import POC, POCList
 from ..utils.utils import has_permission
 from ..services.point_of_contact_service import (
     add_poc_to_lead,
     get_all_pocs,
     get_pocs_by_lead_id,
+    update_poc_by_lead_id,
     delete_poc_by_lead_id
 )
 
@@ -21,48 +22,42 @@ router = APIRouter()
 async def add_poc(
     lead_id: int,
     poc: POC,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", 'admin'])
     ):
     """ROute to add a point of contact to a lead."""
-    cached_keys = ["pocs-all", f"pocs-{lead_id}"]
-    [await redis.delete(key) for key in cached_keys]
-    return add_poc_to_lead(lead_id, poc, db)
+    db_poc = await add_poc_to_lead(lead_id, poc, db)
+    await invalidate(redis, POCS_TAG, lead_tag(lead_id))
+    return db_poc
 
 
 @router.get('/poc/all', response_model=List[POC])
 async def get_all(
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", 'admin', 'viewer'])
     ):
     """Route to retrieve all points of contact."""
-    cached_key = "pocs-all"
-    pocs_data_cache = await redis.get(cached_key)
-    if pocs_data_cache:
-        return json.loads(pocs_data_cache)
-    pocs_data_db =  get_all_pocs(db)
-    await redis.set(cached_key, json.dumps(pocs_data_db), ex=3600)
-    return pocs_data_db
+    async def build():
+        return [POC.model_validate(poc).model_dump() for poc in await get_all_pocs(db)]
+    return await cached(redis, "pocs", [POCS_TAG], ("all",), build, ex=3600)
 
 
 @router.get('/{lead_id}/pocs', response_model=List[POCList])
 async def get_pocs(
     lead_id: int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["sales", 'admin', 'viewer'])
     ):
     """Route to retrieve all points of contact for a specific lead."""
     try:
-        cached_key = f"pocs-{lead_id}"
-        poc_data_cache = await redis.get(cached_key)
-        if poc_data_cache:
-            return json.loads(poc_data_cache)
-        poc_data_db = get_pocs_by_lead_id(lead_id, db)
-        await redis.set(cached_key, json.dumps(poc_data_db), ex=3600)
-        return poc_data_db
+        async def build():
+            return [POCList.model_validate(poc).model_dump() for poc in await get_pocs_by_lead_id(lead_id, db, redis)]
+        return await cached(redis, "pocs", [lead_tag(lead_id)], (lead_id,), build, ex=3600)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -72,15 +67,17 @@ async def update_poc(
     lead_id: int,
     poc_id: int,
     poc: POC,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["admin", "sales"])
     ):
     """Route to update a point of contact by ID."""
     try:
-        cached_keys = ["pocs-all", f"pocs-{lead_id}"]
-        [await redis.delete(key) for key in cached_keys]
-        return update_poc(lead_id, poc_id, poc, db)
+        db_poc = await update_poc_by_lead_id(lead_id, poc_id, poc, db)
+        await invalidate(redis, POCS_TAG, lead_tag(lead_id), CALLS_TAG)
+        return db_poc
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
@@ -89,14 +86,16 @@ async def update_poc(
 async def delete_poc(
     lead_id: int,
     poc_id: int,
-    db: Session = Depends(get_postgres_db),
+    db: AsyncSession = Depends(get_async_postgres_db),
     redis: aioredis.Redis = Depends(get_redis_client),
     permissions: bool = has_permission(["admin"])
     ):
     """Route to delete a point of contact by ID."""
     try:
-        cached_keys = ["pocs-all", f"pocs-{lead_id}"]
-        [await redis.delete(key) for key in cached_keys]
-        return delete_poc_by_lead_id(lead_id, poc_id, db)
+        response = await delete_poc_by_lead_id(lead_id, poc_id, db, redis)
+        await invalidate(redis, POCS_TAG, lead_tag(lead_id), CALLS_TAG)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
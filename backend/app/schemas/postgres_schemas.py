@@ -97,5 +97,9 @@ class CallTodayResponse(CallCreate):
     poc_name: str
     poc_contact: int
 
+class CallAgendaResponse(CallTodayResponse):
+    """Response model for the calls of an agenda, with their time in the agenda's timezone."""
+    scheduled_at: datetime
+
     
 
@@ -0,0 +1,116 @@
+"""This module contains the service functions of the materialized call agenda.
+
+Calls are scheduled in IST (next_call_date, next_call_time). The agenda keeps one
+display-ready row per call with the UTC instant of the call, so the agenda of a day
+in any timezone is the range of rows between the UTC bounds of that local day.
+Rows are written in the transaction of the call, POC or lead change they follow;
+the caller commits.
+"""
+
+from datetime import date, datetime, time, timedelta
+import pytz # type: ignore
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from ..models.postgres_models import CallAgendaModel
+
+SCHEDULE_TIMEZONE = pytz.timezone("Asia/Kolkata")
+DEFAULT_AGENDA_TIMEZONE = "Asia/Kolkata"
+
+
+def agenda_timezone(timezone: str):
+    """Timezone an agenda is requested in."""
+    try:
+        return pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {timezone}")
+
+
+def to_utc(local: datetime, timezone=SCHEDULE_TIMEZONE):
+    """Naive UTC instant of a naive local datetime of a timezone."""
+    return timezone.localize(local).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def agenda_row(call: dict):
+    """Agenda row of a call given with its lead and POC names and POC contact."""
+    return {
+        "call_id": call["id"],
+        "lead_id": call["lead_id"],
+        "poc_id": call["poc_id"],
+        "lead_name": call["lead_name"],
+        "poc_name": call["poc_name"],
+        "poc_contact": str(call["poc_contact"]),
+        "frequency": call["frequency"],
+        "next_call_date": call["next_call_date"],
+        "next_call_time": call["next_call_time"],
+        "scheduled_at": to_utc(datetime.combine(call["next_call_date"], call["next_call_time"]))
+    }
+
+
+async def add_to_agenda(calls, db: AsyncSession):
+    """Add newly scheduled calls to the agenda in a single INSERT statement."""
+    if calls:
+        await db.execute(insert(CallAgendaModel), [agenda_row(call) for call in calls])
+
+
+async def reschedule_in_agenda(db_call, db: AsyncSession):
+    """Move the agenda row of a call to its new schedule and frequency."""
+    await db.execute(
+        update(CallAgendaModel)
+        .where(CallAgendaModel.call_id == db_call.id)
+        .values(
+            frequency=db_call.frequency,
+            next_call_date=db_call.next_call_date,
+            next_call_time=db_call.next_call_time,
+            scheduled_at=to_utc(datetime.combine(db_call.next_call_date, db_call.next_call_time))
+        )
+    )
+
+
+async def rename_lead_in_agenda(lead_id: int, lead_name: str, db: AsyncSession):
+    """Follow the renaming of a lead in its agenda rows."""
+    await db.execute(update(CallAgendaModel).where(CallAgendaModel.lead_id == lead_id).values(lead_name=lead_name))
+
+
+async def update_poc_in_agenda(poc_id: int, poc_name: str, poc_contact: str, db: AsyncSession):
+    """Follow the update of a point of contact in its agenda rows."""
+    await db.execute(
+        update(CallAgendaModel)
+        .where(CallAgendaModel.poc_id == poc_id)
+        .values(poc_name=poc_name, poc_contact=str(poc_contact))
+    )
+
+
+async def remove_lead_from_agenda(lead_id: int, db: AsyncSession):
+    """Remove the agenda rows of a deleted lead."""
+    await db.execute(delete(CallAgendaModel).where(CallAgendaModel.lead_id == lead_id))
+
+
+async def get_agenda(day: date, timezone: str, db: AsyncSession):
+    """Retrieve the calls of a local day of a timezone, ordered by time.
+
+    Every call is returned with its IST schedule and its local time in `scheduled_at`.
+    """
+    tz = agenda_timezone(timezone)
+    start = to_utc(datetime.combine(day, time.min), tz)
+    end = to_utc(datetime.combine(day + timedelta(days=1), time.min), tz)
+    rows = (await db.scalars(
+        select(CallAgendaModel)
+        .where(CallAgendaModel.scheduled_at >= start, CallAgendaModel.scheduled_at < end)
+        .order_by(CallAgendaModel.scheduled_at, CallAgendaModel.call_id)
+    )).all()
+    return [
+        {
+            "id": row.call_id,
+            "lead_id": row.lead_id,
+            "poc_id": row.poc_id,
+            "lead_name": row.lead_name,
+            "poc_name": row.poc_name,
+            "poc_contact": row.poc_contact,
+            "frequency": row.frequency,
+            "next_call_date": row.next_call_date,
+            "next_call_time": row.next_call_time,
+            "scheduled_at": pytz.utc.localize(row.scheduled_at).astimezone(tz)
+        }
+        for row in rows
+    ]
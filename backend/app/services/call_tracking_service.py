@@ -1,33 +1,63 @@
 """This module contains the service functions for the call tracking feature."""
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
+from typing import List
 import pytz # type: ignore
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import cast, DateTime
+import redis.asyncio as aioredis # type: ignore
+from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, insert, select, tuple_, update, Date
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from ..models.postgres_models import LeadModel, CallModel, PointOfContactModel
 from ..schemas.postgres_schemas import CallCreate, CallUpdate
 from ..utils.utils import convert_to_ist
+from .lead_service import get_lead_summary
+from .call_agenda_service import add_to_agenda, reschedule_in_agenda
 
-def add_call_to_lead(lead_id: int, call: CallCreate, db: Session):
+class date_add_days(FunctionElement):
+    """SQL expression of a date plus a number of days, so that a next call date
+    can be computed from a column inside an UPDATE statement."""
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(date_add_days, "postgresql")
+def _date_add_days_postgresql(element, compiler, **kw):
+    start, days = element.clauses
+    return f"(CAST({compiler.process(start, **kw)} AS DATE) + {compiler.process(days, **kw)})"
+
+
+@compiles(date_add_days, "sqlite")
+def _date_add_days_sqlite(element, compiler, **kw):
+    start, days = element.clauses
+    return f"date({compiler.process(start, **kw)}, '+' || {compiler.process(days, **kw)} || ' days')"
+
+
+def to_ist_schedule(next_call_date: date, next_call_time: time, lead_timezone: str, now: datetime):
+    """Date and time in IST of a call planned in the lead's timezone.
+    Calls that would already be past in IST are moved to the next day."""
+    call_datetime = datetime.combine(next_call_date, next_call_time).replace(microsecond=0)
+    if lead_timezone != "Asia/Kolkata":
+        call_datetime = convert_to_ist(str(call_datetime), lead_timezone)
+        if call_datetime < now:
+            call_datetime += timedelta(days=1)
+    return call_datetime.date(), call_datetime.time()
+
+async def add_call_to_lead(lead_id: int, call: CallCreate, db: AsyncSession, redis: aioredis.Redis):
     """Plan a call with a specific lead."""
     try:
-        db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-        if not db_lead:
-            raise HTTPException(status_code=404, detail="Lead not found")
-        db_poc = db.query(PointOfContactModel).filter(PointOfContactModel.id == call.poc_id, PointOfContactModel.lead_id == lead_id).first()
+        lead = await get_lead_summary(lead_id, db, redis)
+        db_poc = await db.scalar(
+            select(PointOfContactModel).where(PointOfContactModel.id == call.poc_id, PointOfContactModel.lead_id == lead_id)
+        )
         if not db_poc:
             raise HTTPException(status_code=404, detail="Point of Contact not found for this lead")
-        lead_timezone = db_lead.timezone
-        call_datetime = f'{call.next_call_date} {call.next_call_time}'
-        if lead_timezone != "Asia/Kolkata":
-            call_datetime = convert_to_ist(call_datetime, lead_timezone)
-            if call_datetime < datetime.now():
-                call_datetime += timedelta(days=1)
-        call_datetime = datetime.strptime(str(call_datetime), '%Y-%m-%d %H:%M:%S')
-        next_call_date = call_datetime.date()
-        next_call_time = call_datetime.time()
+        next_call_date, next_call_time = to_ist_schedule(
+            call.next_call_date, call.next_call_time, lead["timezone"], datetime.now()
+        )
 
         db_call = CallModel(
             poc_id=call.poc_id,
@@ -38,88 +68,138 @@ def add_call_to_lead(lead_id: int, call: CallCreate, db: Session):
             lead_id=lead_id,
         )
         db.add(db_call)
-        db.commit()
-        db.refresh(db_call)
+        await db.flush()
         response = {
             **{key: value for key, value in db_call.__dict__.items() if not key.startswith("_")},
-            "lead_name": db_lead.name,  # Include lead_name
+            "lead_name": lead["name"],  # Include lead_name
             "poc_name": db_poc.name,    # Include poc_name
             "poc_contact": db_poc.phone_number  # Include poc_contact
         }
+        await add_to_agenda([response], db)
+        await db.commit()
         return response
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
-def update_frequency(call_id: int, lead_id: int, call: CallUpdate, db: Session):
-    """Update the frequency of a call."""
+async def add_calls_to_leads(calls: List[CallCreate], db: AsyncSession):
+    """Plan calls with many leads at once.
+
+    Every lead/POC pair is validated by a single joined query and all calls are
+    inserted by a single statement, as are their agenda rows; nothing is scheduled
+    if any pair is invalid.
+    """
+    if not calls:
+        return []
     try:
-        db_call = db.query(CallModel).filter(CallModel.id == call_id, CallModel.lead_id == lead_id).first()
-        if not db_call:
-            raise HTTPException(status_code=404, detail="Call not found")
-        db_call.frequency = call.frequency
-        db_call.next_call_date = datetime.now().date() + timedelta(days=call.frequency)
-        db.commit()
-        db.refresh(db_call)
-        return db_call
+        pairs = {(call.lead_id, call.poc_id) for call in calls}
+        contacts = await db.execute(
+            select(
+                PointOfContactModel.id,
+                PointOfContactModel.lead_id,
+                PointOfContactModel.name,
+                PointOfContactModel.phone_number,
+                LeadModel.name.label("lead_name"),
+                LeadModel.timezone
+            )
+            .join(LeadModel, LeadModel.id == PointOfContactModel.lead_id)
+            .where(tuple_(PointOfContactModel.lead_id, PointOfContactModel.id).in_(pairs))
+        )
+        contacts = {(contact.lead_id, contact.id): contact for contact in contacts}
+        missing = sorted(pairs - contacts.keys())
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Point of Contact not found for these lead/POC pairs: {missing}"
+            )
+        now = datetime.now()
+        values = []
+        for call in calls:
+            contact = contacts[(call.lead_id, call.poc_id)]
+            next_call_date, next_call_time = to_ist_schedule(
+                call.next_call_date, call.next_call_time, contact.timezone, now
+            )
+            values.append({
+                "poc_id": call.poc_id,
+                "lead_id": call.lead_id,
+                "frequency": call.frequency,
+                "last_call_date": None,
+                "next_call_date": next_call_date,
+                "next_call_time": next_call_time,
+            })
+        ids = (await db.scalars(
+            insert(CallModel).returning(CallModel.id, sort_by_parameter_order=True), values
+        )).all()
+        scheduled = [
+            {
+                "id": call_id,
+                **call,
+                "lead_name": contacts[(call["lead_id"], call["poc_id"])].lead_name,
+                "poc_name": contacts[(call["lead_id"], call["poc_id"])].name,
+                "poc_contact": contacts[(call["lead_id"], call["poc_id"])].phone_number
+            }
+            for call_id, call in zip(ids, values)
+        ]
+        await add_to_agenda(scheduled, db)
+        await db.commit()
+        return scheduled
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
-def update_log(call_id: int, lead_id: int, db: Session):
-    """Update the last call date and the next call date of a call once the latest call is done."""
+async def update_frequency(call_id: int, lead_id: int, call: CallUpdate, db: AsyncSession):
+    """Update the frequency of a call in a single UPDATE ... RETURNING statement."""
     try:
-        db_call = db.query(CallModel).filter(CallModel.id == call_id, CallModel.lead_id == lead_id).first()
-        if not db_call:
-            raise HTTPException(status_code=404, detail="Call not found")
-        db_call.last_call_date = datetime.now()
-        db_call.next_call_date = datetime.now().date() + timedelta(days=db_call.frequency)
-
-        db.commit()
-        db.refresh(db_call)
-        return db_call
+        db_call = await db.scalar(
+            update(CallModel)
+            .where(CallModel.id == call_id, CallModel.lead_id == lead_id)
+            .values(frequency=call.frequency, next_call_date=datetime.now().date() + timedelta(days=call.frequency))
+            .returning(CallModel)
+        )
+        if db_call:
+            await reschedule_in_agenda(db_call, db)
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+    if not db_call:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return db_call
 
 
-def get_calls_today(db: Session):
-    """Retrieve all calls scheduled for today."""
+async def update_log(call_id: int, lead_id: int, db: AsyncSession):
+    """Update the last call date and the next call date of a call once the latest call is done,
+    in a single UPDATE ... RETURNING statement."""
     try:
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        calls = (
-            db.query(CallModel)
-            .options(joinedload(CallModel.lead), joinedload(CallModel.poc))
-            .filter(
-                cast(CallModel.next_call_date, DateTime) >= today_start,
-                cast(CallModel.next_call_date, DateTime) < today_end
-            )
-            .all()
+        now = datetime.now()
+        db_call = await db.scalar(
+            update(CallModel)
+            .where(CallModel.id == call_id, CallModel.lead_id == lead_id)
+            .values(last_call_date=now, next_call_date=date_add_days(now.date(), CallModel.frequency))
+            .returning(CallModel)
         )
-        return calls
+        if db_call:
+            await reschedule_in_agenda(db_call, db)
+        await db.commit()
     except SQLAlchemyError as e:
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+    if not db_call:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return db_call
 
 
-def get_all_calls(db: Session):
+async def get_all_calls(db: AsyncSession):
     """Retrieve all calls."""
     try:
-        calls = (
-            db.query(CallModel)
+        calls = (await db.scalars(
+            select(CallModel)
             .options(joinedload(CallModel.lead), joinedload(CallModel.poc))
-            .all()
-        )
+        )).all()
         return calls
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
@@ -127,17 +207,14 @@ def get_all_calls(db: Session):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
 
 
-def delete_call_with_id(call_id: int, db: Session):
-    """Delete a call by its ID."""
+async def delete_call_with_id(call_id: int, db: AsyncSession):
+    """Delete a call by its ID in a single DELETE ... RETURNING statement."""
     try:
-        db_call = db.query(CallModel).filter(CallModel.id == call_id).first()
-        if not db_call:
-            raise HTTPException(status_code=404, detail="Call not found")
-        db.delete(db_call)
-        db.commit()
-        return {"message": "Call deleted successfully"}
+        deleted_id = await db.scalar(delete(CallModel).where(CallModel.id == call_id).returning(CallModel.id))
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}") from e
+    if deleted_id is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return {"message": "Call deleted successfully"}
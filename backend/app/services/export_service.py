@@ -0,0 +1,91 @@
+"""This module contains the services streaming table and interaction exports."""
+
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from fastapi import HTTPException
+from pymongo import ASCENDING
+from sqlalchemy import select
+from ..configs.database.postgres_db import ReadOnlySessionLocal
+from ..models.postgres_models import LeadModel, PointOfContactModel, CallModel
+from ..utils.utils import json_dumps
+from .interaction_service import collection, get_lead_names
+
+# Rows (or interactions) fetched from the server-side cursor and written out together
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_TABLES = {
+    "leads": LeadModel.__table__,
+    "pocs": PointOfContactModel.__table__,
+    "calls": CallModel.__table__,
+}
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def to_csv(rows):
+    """Encode rows as CSV lines."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def to_ndjson(rows):
+    """Encode rows as NDJSON lines."""
+    return b"".join(json_dumps(dict(row._mapping)) + b"\n" for row in rows)
+
+
+async def export_table(entity: str, file_format: str):
+    """Stream all rows of a table as NDJSON or CSV, in batches read from a server-side cursor.
+
+    The export runs with a read-only session of its own (on the replica when there is
+    one), because a streamed response is sent after the request dependencies have been closed.
+    """
+    table = EXPORT_TABLES[entity]
+    async with ReadOnlySessionLocal() as db:
+        result = await db.stream(
+            select(table).order_by(table.c.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if file_format == "csv":
+            yield to_csv([table.columns.keys()])
+        async for rows in result.partitions():
+            yield to_csv(rows) if file_format == "csv" else to_ndjson(rows)
+
+
+def interaction_export_query(lead_id: int = None, start_date: date = None, end_date: date = None):
+    """Filter of an interaction export: interactions of a lead and/or between two
+    dates (inclusive), served by the timeline indexes."""
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    query = {}
+    if lead_id is not None:
+        query["lead_id"] = lead_id
+    if start_date or end_date:
+        query["interaction_at"] = {}
+        if start_date:
+            query["interaction_at"]["$gte"] = datetime.combine(start_date, time.min)
+        if end_date:
+            query["interaction_at"]["$lt"] = datetime.combine(end_date + timedelta(days=1), time.min)
+    return query
+
+
+async def export_interactions(query: dict):
+    """Stream the interactions matching a query as NDJSON, oldest first.
+
+    Interactions are read from the Motor cursor EXPORT_BATCH_SIZE at a time, and the
+    names of the leads of every batch are looked up with a single IN query, so memory
+    stays bounded by the batch size however many interactions are exported.
+    """
+    cursor = collection.find(query).sort([("interaction_at", ASCENDING), ("_id", ASCENDING)]).batch_size(EXPORT_BATCH_SIZE)
+    try:
+        async with ReadOnlySessionLocal() as db:
+            while interactions := await cursor.to_list(length=EXPORT_BATCH_SIZE):
+                lead_names = await get_lead_names([interaction["lead_id"] for interaction in interactions], db)
+                lines = []
+                for interaction in interactions:
+                    interaction["id"] = str(interaction.pop("_id"))
+                    interaction["lead_name"] = lead_names.get(interaction["lead_id"], "Unknown")
+                    lines.append(json_dumps(interaction) + b"\n")
+                yield b"".join(lines)
+    finally:
+        await cursor.close()
@@ -0,0 +1,75 @@
+"""This module contains the service functions for reading interactions from MongoDB.
+
+Interaction listings are paginated by seeking on their sort key, (interaction_at, _id)
+in descending order, which the timeline indexes serve: every page is a bounded index
+range however deep it is. The position of a page is passed around as an opaque cursor.
+"""
+
+import base64
+import binascii
+import os
+from datetime import datetime
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from pymongo import DESCENDING
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..configs.database.mongo_db import mongo_db
+from ..models.postgres_models import LeadModel
+
+load_dotenv(dotenv_path="app/.env")
+
+INTERACTION_COLLECTION = os.getenv('INTERACTION_COLLECTION')
+mongo_db.set_collection(INTERACTION_COLLECTION)
+collection = mongo_db.get_collection()
+
+INTERACTION_SORT = [("interaction_at", DESCENDING), ("_id", DESCENDING)]
+
+
+def encode_cursor(interaction: dict):
+    """Cursor of the page following an interaction."""
+    position = [interaction["interaction_at"].isoformat(), str(interaction["_id"])]
+    return base64.urlsafe_b64encode(orjson.dumps(position)).decode()
+
+
+def decode_cursor(cursor: str):
+    """Sort key (interaction_at, _id) encoded in a cursor."""
+    try:
+        interaction_at, interaction_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(interaction_at), ObjectId(interaction_id)
+    except (binascii.Error, orjson.JSONDecodeError, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def after_cursor(query: dict, cursor: str = None):
+    """Restrict a query to the interactions sorted after the cursor position."""
+    if not cursor:
+        return query
+    interaction_at, interaction_id = decode_cursor(cursor)
+    return {
+        **query,
+        "$or": [
+            {"interaction_at": {"$lt": interaction_at}},
+            {"interaction_at": interaction_at, "_id": {"$lt": interaction_id}},
+        ]
+    }
+
+
+async def get_interactions_page(query: dict, cursor: str = None, limit: int = 50):
+    """Retrieve a page of the interactions matching a query, most recent first.
+
+    Returns the interactions of the page and the cursor of the next page (None on the last page).
+    """
+    interactions = await collection.find(after_cursor(query, cursor)).sort(INTERACTION_SORT).limit(limit + 1).to_list(length=limit + 1)
+    if len(interactions) > limit:
+        return interactions[:limit], encode_cursor(interactions[limit - 1])
+    return interactions, None
+
+
+async def get_lead_names(lead_ids, db: AsyncSession):
+    """Names of the given leads by ID, read with a single query."""
+    leads = await db.execute(select(LeadModel.id, LeadModel.name).where(LeadModel.id.in_(set(lead_ids))))
+    return {lead.id: lead.name for lead in leads}
@@ -1,68 +1,270 @@
 """This module contains the service functions for the Lead model."""
 
-from sqlalchemy.orm import Session
+import csv
+import orjson
+import redis.asyncio as aioredis # type: ignore
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from pydantic import ValidationError
 from ..models.postgres_models import LeadModel
+from ..schemas.postgres_schemas import LeadCreateUpdate
+from ..configs.redis.cache import invalidate, LEADS_TAG
+from ..utils.utils import is_unique_violation
+from .call_agenda_service import rename_lead_in_agenda, remove_lead_from_agenda
 
-def get_lead_by_id(lead_id: int, db: Session):
+# Lead summaries (name, timezone, status) are cached per lead and shared by every
+# service that only needs to know that a lead exists or what it is called.
+# A missing lead is cached as an empty summary.
+LEAD_SUMMARY_TTL = 3600
+MISSING_LEAD_TTL = 60
+
+# Columns leads can be filtered on by the search endpoint
+SEARCH_FILTERS = ("status", "country", "state", "timezone", "area_of_interest")
+
+# Rows validated, checked for duplicates and inserted together by bulk imports
+IMPORT_CHUNK_SIZE = 1000
+
+async def get_lead_by_id(lead_id: int, db: AsyncSession):
     """Retrieve a lead by its ID."""
-    db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
+    db_lead = await db.scalar(select(LeadModel).where(LeadModel.id == lead_id))
     if not db_lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     return db_lead
 
-def create_new_lead(lead, db:Session):
-    """Create a new Lead"""
-    existing_lead = db.query(LeadModel).filter(LeadModel.name == lead.name).first()
-    if existing_lead:
-        raise HTTPException(status_code=400, detail="Lead with this name already exists")
+def lead_summary_key(lead_id: int):
+    """Redis key of the cached summary of a lead."""
+    return f"lead-summary:{lead_id}"
+
+def to_lead_summary(db_lead: LeadModel):
+    """Summary of a lead shared through the cache."""
+    return {
+        "id": db_lead.id,
+        "name": db_lead.name,
+        "timezone": db_lead.timezone,
+        "status": db_lead.status
+    }
+
+async def get_lead_summary(lead_id: int, db: AsyncSession, redis: aioredis.Redis):
+    """Retrieve the name, timezone and status of a lead, reading through the cache."""
+    data = await redis.get(lead_summary_key(lead_id))
+    if data:
+        summary = orjson.loads(data)
+    else:
+        db_lead = await db.scalar(select(LeadModel).where(LeadModel.id == lead_id))
+        summary = to_lead_summary(db_lead) if db_lead else {}
+        # NX: never overwrite a summary written through by a concurrent update
+        await redis.set(
+            lead_summary_key(lead_id), orjson.dumps(summary),
+            ex=LEAD_SUMMARY_TTL if db_lead else MISSING_LEAD_TTL, nx=True
+        )
+    if not summary:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return summary
+
+def lead_summary_record(lead_id: int, summary: dict = None):
+    """Cache record writing the summary of a created or updated lead through,
+    or recording that the lead was deleted when no summary is given."""
+    return {lead_summary_key(lead_id): (orjson.dumps(summary or {}), LEAD_SUMMARY_TTL)}
+
+async def get_leads_page(db: AsyncSession, cursor: int = None, limit: int = 100, status: str = None, country: str = None):
+    """Retrieve a page of leads ordered by ID, starting after the `cursor` lead ID.
+
+    Returns the leads of the page and the cursor of the next page (None on the last page).
+    """
+    query = select(LeadModel)
+    if status:
+        query = query.where(LeadModel.status == status)
+    if country:
+        query = query.where(LeadModel.country == country)
+    if cursor is not None:
+        query = query.where(LeadModel.id > cursor)
+    leads = (await db.scalars(query.order_by(LeadModel.id).limit(limit + 1))).all()
+    if len(leads) > limit:
+        return leads[:limit], leads[limit - 1].id
+    return leads, None
+
+def escape_like(value: str):
+    """Escape the LIKE wildcards of a search term (matched with escape="\\")."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+async def search_leads(db: AsyncSession, q: str = None, mode: str = "prefix", filters: dict = None, offset: int = 0, limit: int = 20):
+    """Search leads by name and filter them on SEARCH_FILTERS columns.
+
+    "prefix" matches names starting with `q`, ordered by name. "fuzzy" matches names
+    containing `q` or similar to it, ordered by similarity on Postgres (pg_trgm,
+    served by ix_leads_name_trgm) and by name on SQLite, which only matches substrings.
+    Matching is case-insensitive.
+
+    Returns the leads of the page and the offset of the next page (None on the last page).
+    """
+    query = select(LeadModel)
+    for column, value in (filters or {}).items():
+        if value:
+            query = query.where(getattr(LeadModel, column) == value)
+    order_by = [LeadModel.name, LeadModel.id]
+    if q:
+        pattern = escape_like(q)
+        if mode == "prefix":
+            query = query.where(LeadModel.name.ilike(f"{pattern}%", escape="\\"))
+        elif db.bind.dialect.name == "postgresql":
+            query = query.where(or_(
+                LeadModel.name.op("%")(q),
+                LeadModel.name.ilike(f"%{pattern}%", escape="\\")
+            ))
+            order_by = [func.similarity(LeadModel.name, q).desc(), LeadModel.id]
+        else:
+            query = query.where(LeadModel.name.ilike(f"%{pattern}%", escape="\\"))
+    leads = (await db.scalars(query.order_by(*order_by).offset(offset).limit(limit + 1))).all()
+    if len(leads) > limit:
+        return leads[:limit], offset + limit
+    return leads, None
+
+async def create_new_lead(lead, db: AsyncSession):
+    """Create a new Lead in a single INSERT ... RETURNING statement;
+    the unique lead name index doubles as the duplicate check."""
     try:
-        db_lead = LeadModel(
-            name=lead.name,
-            address=lead.address,
-            zipcode=lead.zipcode,
-            state=lead.state,
-            country=lead.country,
-            timezone=lead.timezone,
-            area_of_interest=lead.area_of_interest,
-            status=lead.status
+        db_lead = await db.scalar(
+            insert(LeadModel)
+            .values(
+                name=lead.name,
+                address=lead.address,
+                zipcode=lead.zipcode,
+                state=lead.state,
+                country=lead.country,
+                timezone=lead.timezone,
+                area_of_interest=lead.area_of_interest,
+                status=lead.status
+            )
+            .returning(LeadModel)
         )
-        db.add(db_lead)
-        db.commit()
-        db.refresh(db_lead)
+        await db.commit()
         return db_lead
+    except IntegrityError as e:
+        await db.rollback()
+        if is_unique_violation(e):
+            raise HTTPException(status_code=400, detail="Lead with this name already exists") from e
+        raise HTTPException(status_code=400, detail=str(e)) from e
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
-def update_lead_by_id(lead_id: int, lead, db: Session):
-    """Update a lead by its ID."""
+async def update_lead_by_id(lead_id: int, lead, db: AsyncSession):
+    """Update a lead by its ID in a single UPDATE ... RETURNING statement."""
     try:
-        db_lead = get_lead_by_id(lead_id, db)
-        db_lead.name = lead.name
-        db_lead.status = lead.status
-        db_lead.address = lead.address
-        db_lead.zipcode = lead.zipcode
-        db_lead.state = lead.state
-        db_lead.country = lead.country
-        db_lead.area_of_interest = lead.area_of_interest
-        db_lead.timezone = lead.timezone
-        db.commit()
-        db.refresh(db_lead)
-        return db_lead
+        db_lead = await db.scalar(
+            update(LeadModel)
+            .where(LeadModel.id == lead_id)
+            .values(
+                name=lead.name,
+                status=lead.status,
+                address=lead.address,
+                zipcode=lead.zipcode,
+                state=lead.state,
+                country=lead.country,
+                area_of_interest=lead.area_of_interest,
+                timezone=lead.timezone
+            )
+            .returning(LeadModel)
+        )
+        if db_lead:
+            await rename_lead_in_agenda(lead_id, db_lead.name, db)
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    if not db_lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return db_lead
 
-def delete_lead_by_id(lead_id: int, db: Session):
+async def delete_lead_by_id(lead_id: int, db: AsyncSession):
     """Delete a Lead by its ID"""
     try:
-        db_lead = get_lead_by_id(lead_id, db)
+        db_lead = await get_lead_by_id(lead_id, db)
         print(db_lead)
-        db.delete(db_lead)
-        db.commit()
+        await remove_lead_from_agenda(lead_id, db)
+        await db.delete(db_lead)
+        await db.commit()
         return {"message": "Lead deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
+
+def parse_import_row(line: str, file_format: str, header):
+    """Parse and validate one CSV or NDJSON line of a lead import."""
+    if file_format == "ndjson":
+        data = orjson.loads(line)
+    else:
+        data = dict(zip(header, next(csv.reader([line]))))
+    return LeadCreateUpdate.model_validate(data)
+
+def import_error(e: Exception):
+    """Readable message of an import row error."""
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    return str(e)
+
+async def import_lead_chunk(chunk, file_format: str, header, seen: set, db: AsyncSession, redis: aioredis.Redis, report: dict):
+    """Validate a chunk of import lines, check their names for duplicates in one query
+    and insert the new leads in one multi-row statement."""
+    leads = []
+    for row, line in chunk:
+        try:
+            leads.append((row, parse_import_row(line, file_format, header)))
+        except (ValueError, ValidationError, csv.Error) as e:
+            report["errors"].append({"row": row, "error": import_error(e)})
+    names = [lead.name for _, lead in leads]
+    existing = set((await db.scalars(select(LeadModel.name).where(LeadModel.name.in_(names)))).all())
+    rows = []
+    for row, lead in leads:
+        if lead.name in existing or lead.name in seen:
+            report["errors"].append({"row": row, "error": "Lead with this name already exists"})
+            continue
+        seen.add(lead.name)
+        rows.append((row, lead.model_dump()))
+    if not rows:
+        return
+    try:
+        inserted = (await db.execute(
+            insert(LeadModel).returning(LeadModel.id, LeadModel.name, LeadModel.timezone, LeadModel.status),
+            [values for _, values in rows]
+        )).all()
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        report["errors"].extend({"row": row, "error": f"Database error: {e}"} for row, _ in rows)
+        return
+    report["imported"] += len(inserted)
+    records = {}
+    for lead in inserted:
+        records.update(lead_summary_record(lead.id, dict(lead._mapping)))
+    await invalidate(redis, LEADS_TAG, records=records)
+
+async def import_leads(lines, file_format: str, db: AsyncSession, redis: aioredis.Redis):
+    """Import leads from a stream of CSV (with a header line) or NDJSON lines, chunk by chunk.
+
+    Returns the number of imported leads and the errors of the rejected rows
+    (rows are numbered from 1, not counting the CSV header).
+    """
+    report = {"imported": 0, "failed": 0, "errors": []}
+    seen = set()
+    header = None
+    chunk = []
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        if file_format == "csv" and header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+            continue
+        row += 1
+        chunk.append((row, line))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await import_lead_chunk(chunk, file_format, header, seen, db, redis, report)
+            chunk = []
+    if chunk:
+        await import_lead_chunk(chunk, file_format, header, seen, db, redis, report)
+    report["errors"].sort(key=lambda error: error["row"])
+    report["failed"] = len(report["errors"])
+    return report
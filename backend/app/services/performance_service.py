@@ -1,23 +1,179 @@
-"""This module contains functions for retrieving performance data from MongoDB."""
+"""This module contains functions for retrieving performance data from MongoDB.
 
+Performance is read from rollups instead of raw interactions: a collection holding
+one document per lead (`_id` is the lead ID) with its interaction count, order
+count, total order value and last interaction date, and a collection of daily
+buckets holding the same counters per lead and interaction date. Performance over
+a period sums the buckets of its days. Both are maintained on every interaction
+write with atomic $inc / $max updates.
+"""
+
+import asyncio
 import os
+from datetime import date, timedelta
 from dotenv import load_dotenv
-from sqlalchemy.orm import Session
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..configs.database.mongo_db import mongo_db
+from ..configs.database.postgres_db import AsyncSessionLocal
 from ..models.postgres_models import LeadModel
+from .performance_service_pipeline import daily_rollup_pipeline, rollup_pipeline, window_pipeline
 
 load_dotenv(dotenv_path="app/.env")
 
 # Set the MongoDB collection to use
 INTERACTION_COLLECTION = os.getenv('INTERACTION_COLLECTION')
+PERFORMANCE_COLLECTION = os.getenv('PERFORMANCE_COLLECTION', 'lead_performance')
+PERFORMANCE_BUCKET_COLLECTION = os.getenv('PERFORMANCE_BUCKET_COLLECTION', 'lead_performance_daily')
 mongo_db.set_collection(INTERACTION_COLLECTION)
 collection = mongo_db.get_collection()
+rollups = mongo_db.get_db()[PERFORMANCE_COLLECTION]
+buckets = mongo_db.get_db()[PERFORMANCE_BUCKET_COLLECTION]
+
+# Rolling windows of the performance endpoints, in days, and the longest explicit range
+PERFORMANCE_WINDOWS = {"7d": 7, "30d": 30, "90d": 90}
+MAX_PERIOD_DAYS = 366
+
+# Filter, sort and averaging count of each performance view, served by the rollup indexes.
+# "well" and "under" average the order value over all interactions of a lead,
+# "total" over its interactions with orders only.
+PERFORMANCE_VIEWS = {
+    "well": ({}, [("order_count", DESCENDING)], "interaction_count"),
+    "under": (
+        {"order_count": {"$gt": 0}},
+        [("order_count", ASCENDING), ("total_order_value", ASCENDING), ("last_interaction_date", ASCENDING)],
+        "interaction_count"
+    ),
+    "total": ({"order_interaction_count": {"$gt": 0}}, [("_id", ASCENDING)], "order_interaction_count"),
+}
+ROLLUP_INDEXES = [
+    [("order_count", DESCENDING)],
+    [("order_count", ASCENDING), ("total_order_value", ASCENDING), ("last_interaction_date", ASCENDING)],
+    [("order_interaction_count", ASCENDING)],
+]
+BUCKET_INDEXES = [
+    ([("lead_id", ASCENDING), ("date", ASCENDING)], {"unique": True}),
+    ([("date", ASCENDING)], {}),
+]
+
+
+async def create_rollup_indexes():
+    """Create the indexes serving the performance views and the daily buckets."""
+    try:
+        for index in ROLLUP_INDEXES:
+            await rollups.create_index(index)
+        for index, options in BUCKET_INDEXES:
+            await buckets.create_index(index, **options)
+    except PyMongoError as e:
+        print(f"Error creating performance rollup indexes: {e}")
+
+
+def interaction_rollup(interaction: dict):
+    """Contribution of an interaction to the rollup of its lead."""
+    orders = interaction.get("order") or []
+    return {
+        "interaction_count": 1,
+        "order_interaction_count": 1 if orders else 0,
+        "order_count": len(orders),
+        "total_order_value": sum(float(order.get("price") or 0) * float(order.get("quantity") or 0) for order in orders),
+    }
+
+
+def bucket_key(interaction: dict):
+    """Daily bucket of an interaction."""
+    return {"lead_id": interaction["lead_id"], "date": interaction["interaction_date"]}
+
+
+async def add_to_rollup(interaction: dict):
+    """Count a new interaction in the rollup and the daily bucket of its lead."""
+    rollup = interaction_rollup(interaction)
+    await asyncio.gather(
+        rollups.update_one(
+            {"_id": interaction["lead_id"]},
+            {"$inc": rollup, "$max": {"last_interaction_date": interaction["interaction_date"]}},
+            upsert=True
+        ),
+        buckets.update_one(bucket_key(interaction), {"$inc": rollup}, upsert=True)
+    )
+
 
-async def get_performance_data(pipeline, db: Session, limit):
-    """Retrieve performance data using a MongoDB aggregation pipeline."""
-    performance_data = await collection.aggregate(pipeline).to_list(length=limit)
+async def remove_from_bucket(interaction: dict):
+    """Remove a deleted (or replaced) interaction from its daily bucket, dropping emptied buckets."""
+    key = bucket_key(interaction)
+    await buckets.update_one(key, {"$inc": {name: -value for name, value in interaction_rollup(interaction).items()}})
+    await buckets.delete_one({**key, "interaction_count": {"$lte": 0}})
+
+
+async def remove_from_rollup(interaction: dict):
+    """Remove a deleted (or replaced) interaction from the rollup and the daily bucket of its lead.
+
+    The last interaction date cannot be decremented: when the removed interaction
+    was the latest one, it is looked up again (through the lead timeline index) and only
+    set if no newer interaction was counted in the meantime.
+    """
+    lead_id = interaction["lead_id"]
+    await remove_from_bucket(interaction)
+    rollup = await rollups.find_one_and_update(
+        {"_id": lead_id},
+        {"$inc": {key: -value for key, value in interaction_rollup(interaction).items()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if rollup is None:
+        return
+    if rollup["interaction_count"] <= 0:
+        await rollups.delete_one({"_id": lead_id, "interaction_count": {"$lte": 0}})
+        return
+    if rollup.get("last_interaction_date") == interaction["interaction_date"]:
+        latest = await collection.find_one(
+            {"lead_id": lead_id}, {"interaction_date": 1}, sort=[("interaction_at", DESCENDING)]
+        )
+        if latest:
+            await rollups.update_one(
+                {"_id": lead_id, "last_interaction_date": interaction["interaction_date"]},
+                {"$set": {"last_interaction_date": latest["interaction_date"]}}
+            )
+
+
+async def rebuild_rollups():
+    """Recompute every rollup and daily bucket from the raw interactions (initial backfill or repair)."""
+    await rollups.delete_many({})
+    await buckets.delete_many({})
+    await collection.aggregate(rollup_pipeline(PERFORMANCE_COLLECTION)).to_list(length=None)
+    await collection.aggregate(daily_rollup_pipeline(PERFORMANCE_BUCKET_COLLECTION)).to_list(length=None)
+
+
+def performance_period(window: str = "30d", start_date: date = None, end_date: date = None, today: date = None):
+    """First and last day (inclusive) of the period of a performance request, computed
+    when the request is served: an explicit date range, or the rolling `window` ending
+    today. Returns None for the lifetime ("all") window."""
+    today = today or date.today()
+    if start_date or end_date:
+        start_date = start_date or (end_date or today) - timedelta(days=PERFORMANCE_WINDOWS["30d"] - 1)
+        end_date = end_date or today
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+        if (end_date - start_date).days >= MAX_PERIOD_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date ranges are limited to {MAX_PERIOD_DAYS} days")
+        return start_date, end_date
+    if window == "all":
+        return None
+    return today - timedelta(days=PERFORMANCE_WINDOWS[window] - 1), today
+
+
+async def get_performance_data(view: str, db: AsyncSession, limit, period=None):
+    """Retrieve the rollups of a performance view with the names of their leads,
+    over a (start, end) period by summing its daily buckets, or over the lifetime
+    of the leads when no period is given."""
+    query, sort, averaged_over = PERFORMANCE_VIEWS[view]
+    if period:
+        performance_data = await buckets.aggregate(window_pipeline(*period, query, sort, limit)).to_list(length=limit)
+    else:
+        performance_data = await rollups.find(query).sort(sort).to_list(length=limit)
     lead_ids = [performance['_id'] for performance in performance_data]
-    leads = db.query(LeadModel).filter(LeadModel.id.in_(lead_ids)).all()
+    leads = await db.execute(select(LeadModel.id, LeadModel.name).where(LeadModel.id.in_(lead_ids)))
     lead_dict = {lead.id: lead.name for lead in leads}
     response_data = []
     for performance in performance_data:
@@ -25,8 +181,16 @@ async def get_performance_data(pipeline, db: Session, limit):
             "id": performance["_id"],
             "order_count": performance["order_count"],
             "total_order_value": performance["total_order_value"],
-            "avg_order_value": performance["avg_order_value"],
+            "avg_order_value": performance["total_order_value"] / max(performance[averaged_over], 1),
             "last_interaction_date": performance["last_interaction_date"],
             "lead_name": lead_dict.get(performance["_id"], "Unknown"),
         })
     return response_data
+
+
+async def get_detached_performance_data(view: str, limit, period=None):
+    """Retrieve performance data with a session of its own, so that the computation
+    can outlive the request that started it (background cache refreshes). The session
+    is on the primary: an entry built from a lagging replica would outlive its writes."""
+    async with AsyncSessionLocal() as db:
+        return await get_performance_data(view, db, limit, period)
@@ -1,186 +1,100 @@
 """Pipelines for performance service."""
 
-from datetime import datetime, timedelta
+from datetime import date
 
-# Get the start date for the performance data and convert to str
-start_date = datetime.now() - timedelta(days=30)
-start_date_str = start_date.strftime("%Y-%m-%d")
+# Value of every order item of an interaction
+ORDER_VALUES_STAGE = {
+    "$project": {
+        "lead_id": 1,
+        "order_values": {
+            "$map": {
+                "input": {"$ifNull": ["$order", []]},
+                "as": "item",
+                "in": {
+                    "$multiply": [
+                        {"$toDouble": {"$ifNull": ["$$item.price", 0]}},
+                        {"$toDouble": {"$ifNull": ["$$item.quantity", 0]}}
+                    ]
+                }
+            }
+        },
+        "interaction_date": 1
+    }
+}
 
+# Counters of a group of interactions, as kept by the rollups
+ROLLUP_COUNTERS = {
+    "interaction_count": {"$sum": 1},
+    "order_interaction_count": {"$sum": {"$cond": [{"$gt": [{"$size": "$order_values"}, 0]}, 1, 0]}},
+    "order_count": {"$sum": {"$size": "$order_values"}},
+    "total_order_value": {"$sum": {"$sum": "$order_values"}},
+}
 
 
-well_performing_pipeline = [
-    {
-        "$match": {
-            "interaction_date": {"$gte": start_date_str}
-            
-        }
-    },
-    {
-        "$project": {
-            "lead_id": 1,
-            "order_values": {
-                "$map": {
-                    "input": "$order",
-                    "as": "item",
-                    "in": {
-                        "$multiply": [
-                            {"$toDouble": {"$ifNull": ["$$item.price", 0]}},
-                            {"$toDouble": {"$ifNull": ["$$item.quantity", 0]}}
-                        ]
-                    }
-                }
-            },
-            "interaction_date": 1
-        }
-    },
-    {
-        "$group": {
-            "_id": "$lead_id",
-            "order_count": {"$sum": {"$size": "$order_values"}},
-            "total_order_value": {"$sum": {
-                "$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },  # Sum of order values
-            "avg_order_value": {"$avg": {
-                "$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {    # Average order value
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },
-            "last_interaction_date": {"$max": "$interaction_date"}
+def rollup_pipeline(target: str):
+    """Pipeline computing the performance rollup of every lead from its interactions
+    and writing the rollups to the `target` collection."""
+    return [
+        ORDER_VALUES_STAGE,
+        {
+            "$group": {
+                "_id": "$lead_id",
+                **ROLLUP_COUNTERS,
+                "last_interaction_date": {"$max": "$interaction_date"}
+            }
+        },
+        {
+            "$merge": {"into": target, "whenMatched": "replace", "whenNotMatched": "insert"}
         }
-    },
-    {
-        "$sort": {"order_count": -1}
-    }
-]
+    ]
 
 
-under_performing_pipeline = [
-    {
-        "$match": {
-            "interaction_date": {"$gte": start_date_str}
-            
-        }
-    },
-    {
-        "$match": {
-            "interaction_date": {"$gte": start_date_str}
-        }
-    },
-    {
-        "$project": {
-            "lead_id": 1,
-            "order_values": {
-                "$map": {
-                    "input": "$order",
-                    "as": "item",
-                    "in": {
-                        "$multiply": [
-                            {"$toDouble": {"$ifNull": ["$$item.price", 0]}},
-                            {"$toDouble": {"$ifNull": ["$$item.quantity", 0]}}
-                        ]
-                    }
-                }
-            },
-            "interaction_date": 1
-        }
-    },
-    {
-        "$group": {
-            "_id": "$lead_id",
-            "order_count": {"$sum": {"$size": "$order_values"}},
-            "total_order_value": {"$sum": {
-                "$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },  # Sum of order values
-            "avg_order_value": {"$avg": {
-                "$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {    # Average order value
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },
-            "last_interaction_date": {"$max": "$interaction_date"}
-        }
-    },
-    {
-        "$match": {
-            "order_count": {"$gt": 0} 
+def daily_rollup_pipeline(target: str):
+    """Pipeline computing the daily bucket of every lead and interaction date
+    and writing the buckets to the `target` collection."""
+    return [
+        ORDER_VALUES_STAGE,
+        {
+            "$group": {
+                "_id": {"lead_id": "$lead_id", "date": "$interaction_date"},
+                **ROLLUP_COUNTERS
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "lead_id": "$_id.lead_id",
+                "date": "$_id.date",
+                **{counter: 1 for counter in ROLLUP_COUNTERS}
+            }
+        },
+        {
+            "$merge": {"into": target, "on": ["lead_id", "date"], "whenMatched": "replace", "whenNotMatched": "insert"}
         }
-    },
-    {
-        "$sort": {
-            "order_count": 1,
-            "total_order_value": 1,
-            "last_interaction_date": 1 
-        }
-    }
-]
+    ]
 
 
-total_data_pipeline = [
-    {
-        "$match": {
-            "interaction_date": {"$gte": start_date_str}
-            
-        }
-    },
-    {
-        "$project": {
-            "lead_id": 1,
-            "order_values": {
-                "$map": {
-                    "input": "$order",
-                    "as": "item",
-                    "in": {
-                        "$multiply": [
-                            {"$toDouble": {"$ifNull": ["$$item.price", 0]}},
-                            {"$toDouble": {"$ifNull": ["$$item.quantity", 0]}}
-                        ]
-                    }
-                }
-            },
-            "interaction_date": 1
-        }
-    },
-    {
-        "$match": {
-            "order_values": {"$ne": []}
-        }
-    },
-    {
-        "$group": {
-            "_id": "$lead_id",
-            "order_count": {"$sum": {"$size": "$order_values"}},
-            "total_order_value": {"$sum": {
-                "$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },
-            "avg_order_value": {
-                "$avg": {"$reduce": {
-                    "input": "$order_values", "initialValue": 0, "in": {
-                        "$add": ["$$value", "$$this"]
-                        }
-                    }
-                }
-            },
-            "last_interaction_date": {"$max": "$interaction_date"}
+def window_pipeline(start: date, end: date, query: dict, sort, limit: int):
+    """Pipeline summing the daily buckets from `start` to `end` (inclusive) into
+    one rollup per lead, then filtering, sorting and limiting them like a view."""
+    return [
+        {
+            "$match": {
+                "date": {"$gte": start.strftime("%Y-%m-%d"), "$lte": end.strftime("%Y-%m-%d")}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$lead_id",
+                **{counter: {"$sum": f"${counter}"} for counter in ROLLUP_COUNTERS},
+                "last_interaction_date": {"$max": "$date"}
+            }
+        },
+        *([{"$match": query}] if query else []),
+        {
+            "$sort": dict(sort)
+        },
+        {
+            "$limit": limit
         }
-    }
-]
+    ]
@@ -1,94 +1,98 @@
 """This module contains services for the point of contact resource."""
 
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+import redis.asyncio as aioredis # type: ignore
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from fastapi import HTTPException
-from ..models.postgres_models import LeadModel, PointOfContactModel
+from ..models.postgres_models import PointOfContactModel
 from ..schemas.postgres_schemas import POC
+from ..utils.utils import is_foreign_key_violation
+from .lead_service import get_lead_summary
+from .call_agenda_service import update_poc_in_agenda
 
 
-def add_poc_to_lead(lead_id: int, poc: POC, db: Session):
-    """Add a point of contact to a lead."""
-    db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-    if not db_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-    db_poc = PointOfContactModel(
-        name=poc.name,
-        role=poc.role,
-        email=poc.email,
-        phone_number=poc.phone_number,
-        lead_id=lead_id
-    )
+async def add_poc_to_lead(lead_id: int, poc: POC, db: AsyncSession):
+    """Add a point of contact to a lead in a single INSERT ... RETURNING statement;
+    the lead foreign key doubles as the existence check of the lead."""
     try:
-        db.add(db_poc)
-        db.commit()
-        db.refresh(db_poc)
+        db_poc = await db.scalar(
+            insert(PointOfContactModel)
+            .values(
+                name=poc.name,
+                role=poc.role,
+                email=poc.email,
+                phone_number=str(poc.phone_number),
+                lead_id=lead_id
+            )
+            .returning(PointOfContactModel)
+        )
+        await db.commit()
         return db_poc
+    except IntegrityError as e:
+        await db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=404, detail="Lead not found") from e
+        raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
 
 
-def get_all_pocs(db: Session):
+async def get_all_pocs(db: AsyncSession):
     """Retrieve all points of contact."""
     try:
-        poc_data = db.query(PointOfContactModel).all()
+        poc_data = (await db.scalars(select(PointOfContactModel))).all()
         poc_data_dict = [poc.to_dict() for poc in poc_data]
         return poc_data_dict
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
 
 
-def get_pocs_by_lead_id(lead_id: int, db: Session):
+async def get_pocs_by_lead_id(lead_id: int, db: AsyncSession, redis: aioredis.Redis):
     """Retrieve all points of contact for a specific lead."""
-    db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-    if not db_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
+    await get_lead_summary(lead_id, db, redis)
     try:
-        pocs_by_lead = db.query(PointOfContactModel).filter(PointOfContactModel.lead_id == lead_id).all()
+        pocs_by_lead = (await db.scalars(
+            select(PointOfContactModel).where(PointOfContactModel.lead_id == lead_id)
+        )).all()
         pocs_by_lead_dict = [poc.to_dict() for poc in pocs_by_lead]
         return pocs_by_lead_dict
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
 
 
-def update_poc_by_lead_id(lead_id: int, poc_id: int, poc: POC, db: Session):
-    """Update a point of contact by ID."""
-    db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-    if not db_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-
-    db_poc = db.query(PointOfContactModel).filter(PointOfContactModel.id == poc_id).first()
-    if not db_poc:
-        raise HTTPException(status_code=404, detail="Point of contact not found")
-
-    db_poc.name = poc.name
-    db_poc.role = poc.role
-    db_poc.email = poc.email
-    db_poc.phone_number = poc.phone_number
-
+async def update_poc_by_lead_id(lead_id: int, poc_id: int, poc: POC, db: AsyncSession):
+    """Update a point of contact of a lead by ID in a single UPDATE ... RETURNING statement."""
     try:
-        db.commit()
-        db.refresh(db_poc)
-        return db_poc
+        db_poc = await db.scalar(
+            update(PointOfContactModel)
+            .where(PointOfContactModel.id == poc_id, PointOfContactModel.lead_id == lead_id)
+            .values(name=poc.name, role=poc.role, email=poc.email, phone_number=str(poc.phone_number))
+            .returning(PointOfContactModel)
+        )
+        if db_poc:
+            await update_poc_in_agenda(poc_id, db_poc.name, db_poc.phone_number, db)
+        await db.commit()
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
+    if not db_poc:
+        raise HTTPException(status_code=404, detail="Point of contact not found for this lead")
+    return db_poc
 
 
-def delete_poc_by_lead_id(lead_id: int, poc_id: int, db: Session):
+async def delete_poc_by_lead_id(lead_id: int, poc_id: int, db: AsyncSession, redis: aioredis.Redis):
     """Delete a point of contact by ID."""
-    db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
-    if not db_lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
-    db_poc = db.query(PointOfContactModel).filter(PointOfContactModel.id == poc_id).first()
+    await get_lead_summary(lead_id, db, redis)
+    db_poc = await db.scalar(select(PointOfContactModel).where(PointOfContactModel.id == poc_id))
     if not db_poc:
         raise HTTPException(status_code=404, detail="Point of contact not found")
 
     try:
-        db.delete(db_poc)
-        db.commit()
+        await db.delete(db_poc)
+        await db.commit()
         return {"message": "Point of contact deleted successfully"}
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}") from e
@@ -1,5 +1,6 @@
 """Utility functions for the FastAPI application."""
 
+import codecs
 from typing import List
 from bson import ObjectId
 from fastapi import Depends, HTTPException
@@ -7,7 +8,9 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt # type: ignore
 from datetime import date, datetime, time, timedelta
 from passlib.context import CryptContext # type: ignore
+from sqlalchemy.exc import IntegrityError
 import os
+import orjson
 import pytz # type: ignore
 from dotenv import load_dotenv
 
@@ -66,6 +69,14 @@ def has_permission(required_roles: List[str]):
         return True
     return Depends(permission_dependency)
 
+def is_foreign_key_violation(e: IntegrityError) -> bool:
+    """Whether a database error was raised by a foreign key constraint (Postgres or SQLite)"""
+    return getattr(e.orig, "pgcode", None) == "23503" or "FOREIGN KEY constraint failed" in str(e.orig)
+
+def is_unique_violation(e: IntegrityError) -> bool:
+    """Whether a database error was raised by a unique constraint (Postgres or SQLite)"""
+    return getattr(e.orig, "pgcode", None) == "23505" or "UNIQUE constraint failed" in str(e.orig)
+
 def convert_to_ist(call_time, lead_timezone):
     """Convert to timezone of any country to IST"""
     call_time = datetime.strptime(call_time, "%Y-%m-%d %H:%M:%S")
@@ -86,8 +97,26 @@ def convert_to_date_and_time(datetime_iso):
     return formatted_date
 
 def json_serializer(obj):
+    """Serialize the types JSON encoders do not support natively"""
     if isinstance(obj, (date, time)):
         return obj.isoformat()
     elif isinstance(obj, ObjectId):
         return str(obj)
-    raise TypeError(f"Type {type(obj)} not serializable")
\ No newline at end of file
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+def json_dumps(obj) -> bytes:
+    """Serialize to JSON bytes with orjson, which handles dates and times natively"""
+    return orjson.dumps(obj, default=json_serializer)
+
+async def iter_lines(chunks):
+    """Split an async stream of UTF-8 byte chunks (e.g. Request.stream()) into lines"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
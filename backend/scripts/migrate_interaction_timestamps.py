@@ -0,0 +1,70 @@
+"""Add the typed `interaction_at` timestamp to the interactions stored before it existed.
+
+Interactions are read in batches in _id order and updated with one bulk write per
+batch, so the migration can run on a live collection and be resumed at any time;
+documents that already have the field are skipped. Run it from the backend directory:
+
+    python -m scripts.migrate_interaction_timestamps [batch size]
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pymongo import UpdateOne
+from app.configs.database.mongo_db import mongo_db
+from app.services.performance_service import collection
+
+BATCH_SIZE = 1000
+
+
+def interaction_at(interaction: dict):
+    """Timestamp of an interaction from its date and time strings, None if they cannot be parsed."""
+    try:
+        return datetime.strptime(
+            f"{interaction['interaction_date']} {interaction.get('interaction_time') or '00:00:00'}",
+            "%Y-%m-%d %H:%M:%S"
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+async def migrate_batch(after, batch_size: int = BATCH_SIZE):
+    """Migrate the next batch of interactions after the `after` _id.
+
+    Returns the last _id of the batch (None once every interaction was read),
+    the number of interactions updated and the _ids that could not be parsed.
+    """
+    query = {"interaction_at": {"$exists": False}}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    batch = await collection.find(
+        query, {"interaction_date": 1, "interaction_time": 1}
+    ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+    if not batch:
+        return None, 0, []
+    updates, invalid = [], []
+    for interaction in batch:
+        timestamp = interaction_at(interaction)
+        if timestamp is None:
+            invalid.append(interaction["_id"])
+        else:
+            updates.append(UpdateOne({"_id": interaction["_id"]}, {"$set": {"interaction_at": timestamp}}))
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+    return batch[-1]["_id"], len(updates), invalid
+
+
+async def main(batch_size: int = BATCH_SIZE):
+    after, migrated, invalid = None, 0, []
+    while True:
+        after, updated, unparsed = await migrate_batch(after, batch_size)
+        if after is None:
+            break
+        migrated += updated
+        invalid += unparsed
+        print(f"Migrated {migrated} interactions")
+    await mongo_db.create_indexes()
+    print(f"Done: {migrated} interactions migrated, {len(invalid)} without a valid date: {invalid}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_SIZE))
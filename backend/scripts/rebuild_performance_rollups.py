@@ -0,0 +1,25 @@
+"""Recompute the per-lead performance rollups and daily buckets from the raw interactions.
+
+Run once after deploying the rollups (and whenever they need repairing), from
+the backend directory, while interaction writes are paused:
+
+    python -m scripts.rebuild_performance_rollups
+"""
+import asyncio
+from app.configs.redis.cache import invalidate, PERFORMANCE_TAG
+from app.configs.redis.redis import redis_client
+from app.services.performance_service import create_rollup_indexes, rebuild_rollups, buckets, rollups
+
+
+async def main():
+    await create_rollup_indexes()
+    await rebuild_rollups()
+    await invalidate(redis_client, PERFORMANCE_TAG)
+    print(
+        f"Rebuilt {await rollups.count_documents({})} performance rollups "
+        f"and {await buckets.count_documents({})} daily buckets"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
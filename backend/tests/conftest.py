@@ -3,3 +3,46 @@ import os
 
 # Add the project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.configs.database import postgres_db
+
+SESSION_FACTORIES = ("SessionLocal", "AsyncSessionLocal", "ReadOnlySessionLocal")
+
+
+@pytest.fixture
+def temp_database(request, tmp_path):
+    """Throwaway SQLite database with the app schema, so tests never touch the configured one.
+
+    The session factories of the app modules are patched to it and exposed on the
+    test class as SessionLocal (sync) and AsyncSessionLocal.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    async_engine = create_async_engine(postgres_db.to_async_url(url))
+    postgres_db.enable_sqlite_foreign_keys(engine)
+    postgres_db.enable_sqlite_foreign_keys(async_engine.sync_engine)
+    postgres_db.Base.metadata.create_all(engine)
+    factories = {
+        "SessionLocal": sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        "AsyncSessionLocal": async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False),
+    }
+    factories["ReadOnlySessionLocal"] = factories["AsyncSessionLocal"]
+    patches = [
+        patch.object(module, name, factories[name])
+        for module in list(sys.modules.values()) if getattr(module, "__name__", "").startswith("app.")
+        for name in SESSION_FACTORIES if getattr(module, name, None) is getattr(postgres_db, name)
+    ]
+    for patcher in patches:
+        patcher.start()
+    if request.cls is not None:
+        request.cls.SessionLocal = factories["SessionLocal"]
+        request.cls.AsyncSessionLocal = factories["AsyncSessionLocal"]
+    yield factories
+    for patcher in patches:
+        patcher.stop()
+    engine.dispose()
+    async_engine.sync_engine.dispose()
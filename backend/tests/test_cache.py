@@ -0,0 +1,180 @@
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import unittest
+from unittest.mock import patch
+import fakeredis
+import orjson
+from prometheus_client import REGISTRY # type: ignore
+from app.configs.redis import cache
+from app.configs.redis.local_cache import LocalCache, local_cache
+
+
+class TestCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.builds = 0
+        local_cache.reset()
+
+    def build(self):
+        self.builds += 1
+        return [{"id": self.builds}]
+
+    async def test_cached_builds_once(self):
+        first = await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        second = await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        self.assertEqual(first.body, b'[{"id":1}]')
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(self.builds, 1)
+
+    async def test_payload_headers_are_cached(self):
+        def build():
+            return cache.Payload([{"id": 1}], {"X-Next-Cursor": "1"})
+        await cache.cached(self.redis, "leads", [cache.LEADS_TAG], (None, 1), build)
+        local_cache.reset()
+        response = await cache.cached(self.redis, "leads", [cache.LEADS_TAG], (None, 1), build)
+        self.assertEqual(response.headers["X-Next-Cursor"], "1")
+        self.assertEqual(orjson.loads(response.body), [{"id": 1}])
+
+    async def test_invalidate_changes_key(self):
+        await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        await cache.invalidate(self.redis, cache.CALLS_TAG)
+        result = await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        self.assertEqual(orjson.loads(result.body), [{"id": 2}])
+
+    async def test_invalidate_leaves_other_tags(self):
+        await cache.cached(self.redis, "pocs", [cache.lead_tag(1)], (1,), self.build)
+        await cache.invalidate(self.redis, cache.lead_tag(2))
+        await cache.cached(self.redis, "pocs", [cache.lead_tag(1)], (1,), self.build)
+        self.assertEqual(self.builds, 1)
+
+    async def test_concurrent_misses_build_once(self):
+        async def slow_build():
+            await asyncio.sleep(0.01)
+            return self.build()
+        results = await asyncio.gather(*[
+            cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), slow_build)
+            for _ in range(5)
+        ])
+        self.assertEqual(self.builds, 1)
+        self.assertTrue(all(result.body == b'[{"id":1}]' for result in results))
+        self.assertEqual(await self.redis.keys("lock:*"), [])
+
+    async def test_coherent_worker_serves_hits_from_memory(self):
+        local_cache.reset(coherent=True)
+        await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        await self.redis.flushall()
+        result = await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        self.assertEqual(result.body, b'[{"id":1}]')
+        self.assertEqual(self.builds, 1)
+
+    async def test_invalidate_publishes_new_versions(self):
+        local_cache.reset(coherent=True)
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe("cache-invalidation")
+        await pubsub.get_message(timeout=1)
+        await cache.invalidate(self.redis, cache.CALLS_TAG, cache.LEADS_TAG)
+        message = await pubsub.get_message(timeout=1)
+        self.assertEqual(orjson.loads(message["data"]), {"calls": 1, "leads": 1})
+        self.assertEqual(local_cache.get_versions([cache.CALLS_TAG, cache.LEADS_TAG]), [1, 1])
+        await pubsub.aclose()
+
+    async def test_fresh_entry_is_a_hit(self):
+        await cache.cached_with_freshness(self.redis, "performance", [cache.PERFORMANCE_TAG], ("well",), self.build, stale_after=300)
+        response = await cache.cached_with_freshness(
+            self.redis, "performance", [cache.PERFORMANCE_TAG], ("well",), self.build, stale_after=300
+        )
+        self.assertEqual(response.body, b'[{"id":1}]')
+        self.assertEqual(response.headers["X-Cache"], "hit")
+        self.assertEqual(response.headers["Age"], "0")
+
+    async def test_stale_entry_is_served_and_refreshed_in_background(self):
+        response = await cache.cached_with_freshness(
+            self.redis, "performance", [cache.PERFORMANCE_TAG], ("well",), self.build, stale_after=300
+        )
+        self.assertEqual(response.headers["X-Cache"], "miss")
+        with patch("app.configs.redis.cache.time.time", return_value=cache.time.time() + 600):
+            response = await cache.cached_with_freshness(
+                self.redis, "performance", [cache.PERFORMANCE_TAG], ("well",), self.build, stale_after=300
+            )
+            self.assertEqual(response.body, b'[{"id":1}]')
+            self.assertEqual(response.headers["X-Cache"], "stale")
+            self.assertGreaterEqual(int(response.headers["Age"]), 600)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        self.assertEqual(self.builds, 2)
+
+    async def test_background_refreshes_are_referenced_until_done(self):
+        release = asyncio.Event()
+        async def build():
+            await release.wait()
+            return [{"id": 2}]
+        cache.schedule_refresh(self.redis, "performance:refresh", build, stale_after=0)
+        self.assertEqual(len(cache._refresh_tasks), 1)
+        self.assertIn("performance:refresh", cache._refreshing)
+        release.set()
+        await asyncio.gather(*cache._refresh_tasks)
+        await asyncio.sleep(0)
+        self.assertEqual(cache._refresh_tasks, set())
+        self.assertNotIn("performance:refresh", cache._refreshing)
+
+    async def test_large_payloads_are_stored_compressed(self):
+        def build():
+            return [{"notes": "x" * cache.COMPRESSION_THRESHOLD}]
+        await cache.cached(self.redis, "interactions", [cache.INTERACTIONS_TAG], ("all",), build)
+        [key] = await self.redis.keys("interactions:*")
+        data = await self.redis.get(key)
+        self.assertLess(len(data), cache.COMPRESSION_THRESHOLD)
+        self.assertEqual(orjson.loads(data.partition(b"\n")[0])["codec"], "zlib")
+        local_cache.reset()
+        response = await cache.cached(self.redis, "interactions", [cache.INTERACTIONS_TAG], ("all",), build)
+        self.assertEqual(orjson.loads(response.body), build())
+
+    async def test_hits_and_misses_are_counted_per_family(self):
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+        misses = sample("cache_misses_total", family="calls")
+        hits = sample("cache_hits_total", family="calls", tier="redis")
+        builds = sample("cache_rebuild_duration_seconds_count", family="calls")
+        await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        local_cache.reset()
+        await cache.cached(self.redis, "calls", [cache.CALLS_TAG], ("all",), self.build)
+        self.assertEqual(sample("cache_misses_total", family="calls"), misses + 1)
+        self.assertEqual(sample("cache_hits_total", family="calls", tier="redis"), hits + 1)
+        self.assertEqual(sample("cache_rebuild_duration_seconds_count", family="calls"), builds + 1)
+
+    async def test_record_tags_are_counted_with_their_family(self):
+        invalidations = REGISTRY.get_sample_value("cache_invalidations_total", {"family": "leads"}) or 0
+        await cache.invalidate(self.redis, cache.lead_tag(7))
+        self.assertEqual(REGISTRY.get_sample_value("cache_invalidations_total", {"family": "leads"}), invalidations + 1)
+        self.assertIsNone(REGISTRY.get_sample_value("cache_invalidations_total", {"family": "lead"}))
+
+
+class TestLocalCache(unittest.TestCase):
+    def test_evicts_least_recently_used_above_size_bound(self):
+        local = LocalCache(max_bytes=10, ttl=60)
+        local.set("a", 1, 4)
+        local.set("b", 2, 4)
+        local.get("a")
+        local.set("c", 3, 4)
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("a"), 1)
+        self.assertEqual(local.size, 8)
+
+    def test_expired_entries_are_misses(self):
+        local = LocalCache(max_bytes=10, ttl=60)
+        local.set("a", 1, 4, ttl=5)
+        with patch("app.configs.redis.local_cache.time.monotonic", return_value=float("inf")):
+            self.assertIsNone(local.get("a"))
+
+    def test_versions_are_only_trusted_while_coherent(self):
+        local = LocalCache()
+        local.update_versions({"calls": 3})
+        self.assertIsNone(local.get_versions(["calls"]))
+        local.reset(coherent=True)
+        local.update_versions({"calls": 3})
+        local.update_versions({"calls": 2})
+        self.assertEqual(local.get_versions(["calls"]), [3])
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date, datetime, time
+from unittest.mock import Mock
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.postgres_models import LeadModel, PointOfContactModel
+from app.schemas.postgres_schemas import CallCreate, CallUpdate
+from app.services import call_agenda_service, call_tracking_service
+
+
+class TestCallTrackingService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = Mock(spec=AsyncSession)
+
+    def test_to_ist_schedule_converts_lead_timezone(self):
+        now = datetime(2026, 1, 1, 0, 0)
+        self.assertEqual(
+            call_tracking_service.to_ist_schedule(date(2026, 1, 5), time(9, 0), "UTC", now),
+            (date(2026, 1, 5), time(14, 30))
+        )
+        self.assertEqual(
+            call_tracking_service.to_ist_schedule(date(2026, 1, 5), time(9, 0), "Asia/Kolkata", now),
+            (date(2026, 1, 5), time(9, 0))
+        )
+
+    async def test_bulk_scheduling_rejects_unknown_pairs(self):
+        contact = Mock(id=1, lead_id=1, timezone="UTC", lead_name="Lead", phone_number=1)
+        self.db.execute.return_value = [contact]
+        calls = [
+            CallCreate(lead_id=lead_id, poc_id=poc_id, frequency=1, next_call_date=date(2026, 1, 5), next_call_time=time(9, 0))
+            for lead_id, poc_id in ((1, 1), (2, 5))
+        ]
+        with self.assertRaises(HTTPException) as context:
+            await call_tracking_service.add_calls_to_leads(calls, self.db)
+        self.assertEqual(context.exception.status_code, 404)
+        self.assertIn("(2, 5)", context.exception.detail)
+        self.assertFalse(self.db.scalars.called)
+
+    async def test_bulk_scheduling_inserts_once(self):
+        contacts = [Mock(id=poc_id, lead_id=poc_id, timezone="Asia/Kolkata", lead_name=f"Lead {poc_id}", phone_number=poc_id)
+                    for poc_id in (1, 2)]
+        for contact in contacts:
+            contact.name = f"POC {contact.id}"
+        self.db.execute.return_value = contacts
+        self.db.scalars.return_value = Mock(all=Mock(return_value=[10, 11]))
+        calls = [
+            CallCreate(lead_id=poc_id, poc_id=poc_id, frequency=1, next_call_date=date(2026, 1, 5), next_call_time=time(9, 0))
+            for poc_id in (1, 2)
+        ]
+        result = await call_tracking_service.add_calls_to_leads(calls, self.db)
+        self.assertEqual([call["id"] for call in result], [10, 11])
+        self.assertEqual([call["poc_name"] for call in result], ["POC 1", "POC 2"])
+        self.assertEqual(self.db.scalars.call_count, 1)
+        self.db.commit.assert_awaited_once()
+
+
+@pytest.mark.usefixtures("temp_database")
+class TestCallAgenda(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with self.SessionLocal() as db:
+            db.add(LeadModel(id=1, name="Lead", address="a", zipcode="1", state="s",
+                             country="IN", timezone="Asia/Kolkata", area_of_interest="x"))
+            db.add(PointOfContactModel(id=1, lead_id=1, name="POC", role="r", phone_number="42"))
+            db.commit()
+        self.redis = fakeredis.FakeAsyncRedis()
+
+    async def agenda(self, day, timezone="Asia/Kolkata"):
+        async with self.AsyncSessionLocal() as db:
+            return await call_agenda_service.get_agenda(day, timezone, db)
+
+    async def schedule(self):
+        call = CallCreate(lead_id=1, poc_id=1, frequency=2, next_call_date=date(2030, 1, 5), next_call_time=time(3, 0))
+        async with self.AsyncSessionLocal() as db:
+            return await call_tracking_service.add_call_to_lead(1, call, db, self.redis)
+
+    async def test_scheduled_call_is_in_the_agenda_of_each_timezone(self):
+        call = await self.schedule()
+        [row] = await self.agenda(date(2030, 1, 5))
+        self.assertEqual((row["id"], row["lead_name"], row["poc_name"]), (call["id"], "Lead", "POC"))
+        self.assertEqual(row["scheduled_at"].isoformat(), "2030-01-05T03:00:00+05:30")
+        # 03:00 IST is still the previous day in New York
+        self.assertEqual(await self.agenda(date(2030, 1, 5), "America/New_York"), [])
+        [row] = await self.agenda(date(2030, 1, 4), "America/New_York")
+        self.assertEqual(row["scheduled_at"].isoformat(), "2030-01-04T16:30:00-05:00")
+
+    async def test_rescheduled_and_deleted_calls_follow_in_the_agenda(self):
+        call = await self.schedule()
+        async with self.AsyncSessionLocal() as db:
+            db_call = await call_tracking_service.update_frequency(call["id"], 1, CallUpdate(frequency=1), db)
+        [row] = await self.agenda(db_call.next_call_date)
+        self.assertEqual(row["frequency"], 1)
+        self.assertEqual(await self.agenda(date(2030, 1, 5)), [])
+        async with self.AsyncSessionLocal() as db:
+            await call_tracking_service.delete_call_with_id(call["id"], db)
+        self.assertEqual(await self.agenda(db_call.next_call_date), [])
+
+    async def test_unknown_timezone_is_rejected(self):
+        with self.assertRaises(HTTPException) as context:
+            await self.agenda(date(2030, 1, 5), "Mars/Olympus")
+        self.assertEqual(context.exception.status_code, 400)
@@ -0,0 +1,64 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, Mock, patch
+import orjson
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from app.models.postgres_models import LeadModel
+from app.services import export_service
+
+
+@pytest.mark.usefixtures("temp_database")
+class TestExportService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with self.SessionLocal() as db:
+            db.add_all([
+                LeadModel(name=f"Lead {i}", address="1, Main St", zipcode="1", state="s",
+                          country="IN", timezone="UTC", area_of_interest="x")
+                for i in range(5)
+            ])
+            db.commit()
+
+    async def export(self, entity, file_format):
+        return b"".join([chunk async for chunk in export_service.export_table(entity, file_format)])
+
+    async def test_ndjson_export_streams_every_row_in_batches(self):
+        with patch.object(export_service, "EXPORT_BATCH_SIZE", 2):
+            chunks = [chunk async for chunk in export_service.export_table("leads", "ndjson")]
+        rows = [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual([row["name"] for row in rows], [f"Lead {i}" for i in range(5)])
+        self.assertEqual(len(chunks), 3)
+
+    async def test_csv_export_has_header_and_quotes_values(self):
+        lines = (await self.export("leads", "csv")).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["id", "name"])
+        self.assertIn('"1, Main St"', lines[1])
+        self.assertEqual(len(lines), 6)
+
+    async def test_interaction_export_enriches_each_batch_with_one_query(self):
+        batches = [
+            [{"_id": ObjectId(), "lead_id": lead_id, "interaction_at": datetime(2026, 1, 5)} for lead_id in (1, 2)],
+            [{"_id": ObjectId(), "lead_id": 42, "interaction_at": datetime(2026, 1, 6)}],
+            [],
+        ]
+        cursor = Mock(to_list=AsyncMock(side_effect=batches), close=AsyncMock())
+        collection = Mock()
+        collection.find.return_value.sort.return_value.batch_size.return_value = cursor
+        with patch.object(export_service, "collection", collection), \
+                patch.object(export_service, "get_lead_names", wraps=export_service.get_lead_names) as get_lead_names:
+            chunks = [chunk async for chunk in export_service.export_interactions({"lead_id": 1})]
+        rows = [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual([row["lead_name"] for row in rows], ["Lead 0", "Lead 1", "Unknown"])
+        self.assertEqual(rows[0]["interaction_at"], "2026-01-05T00:00:00")
+        self.assertEqual(get_lead_names.call_count, 2)
+        self.assertEqual(len(chunks), 2)
+        cursor.close.assert_awaited_once()
+
+    def test_interaction_export_query_uses_an_inclusive_date_range(self):
+        self.assertEqual(export_service.interaction_export_query(3, date(2026, 1, 1), date(2026, 1, 31)), {
+            "lead_id": 3,
+            "interaction_at": {"$gte": datetime(2026, 1, 1), "$lt": datetime(2026, 2, 1)}
+        })
+        with self.assertRaises(HTTPException):
+            export_service.interaction_export_query(None, date(2026, 2, 1), date(2026, 1, 1))
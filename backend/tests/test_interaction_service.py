@@ -0,0 +1,81 @@
+import unittest
+from datetime import date, datetime, time
+from unittest.mock import AsyncMock, Mock, patch
+from bson import ObjectId
+from fastapi import HTTPException
+from app.models.mongo_models import NewInteraction
+from app.routes import interaction_tracking_routes
+from app.services import interaction_service
+
+
+def interaction(minute):
+    return {"_id": ObjectId(), "lead_id": 1, "interaction_at": datetime(2026, 1, 5, 9, minute)}
+
+
+class TestInteractionPages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.collection = Mock()
+        patch.object(interaction_service, "collection", self.collection).start()
+        self.addCleanup(patch.stopall)
+
+    def returns(self, interactions):
+        cursor = Mock(to_list=AsyncMock(return_value=interactions))
+        self.collection.find.return_value = Mock(sort=Mock(return_value=Mock(limit=Mock(return_value=cursor))))
+
+    def test_cursor_round_trip(self):
+        last = interaction(30)
+        self.assertEqual(
+            interaction_service.decode_cursor(interaction_service.encode_cursor(last)),
+            (last["interaction_at"], last["_id"])
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(HTTPException) as context:
+            interaction_service.decode_cursor("not-a-cursor")
+        self.assertEqual(context.exception.status_code, 400)
+
+    async def test_page_seeks_after_the_cursor_and_returns_the_next_one(self):
+        page = [interaction(minute) for minute in (3, 2, 1)]
+        self.returns(page)
+        cursor = interaction_service.encode_cursor(interaction(4))
+        interactions, next_cursor = await interaction_service.get_interactions_page({"lead_id": 1}, cursor, 2)
+        self.assertEqual(interactions, page[:2])
+        self.assertEqual(interaction_service.decode_cursor(next_cursor), (page[1]["interaction_at"], page[1]["_id"]))
+        query = self.collection.find.call_args.args[0]
+        self.assertEqual(query["lead_id"], 1)
+        self.assertEqual(query["$or"][0], {"interaction_at": {"$lt": datetime(2026, 1, 5, 9, 4)}})
+
+    async def test_last_page_has_no_next_cursor(self):
+        self.returns([interaction(1)])
+        interactions, next_cursor = await interaction_service.get_interactions_page({}, None, 2)
+        self.assertEqual(len(interactions), 1)
+        self.assertIsNone(next_cursor)
+        self.assertEqual(self.collection.find.call_args.args[0], {})
+
+
+class TestInteractionUpdate(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.collection = Mock()
+        self.invalidate = AsyncMock()
+        patch.object(interaction_tracking_routes, "collection", self.collection).start()
+        patch.object(interaction_tracking_routes, "invalidate", self.invalidate).start()
+        patch.object(interaction_tracking_routes, "add_to_rollup", AsyncMock()).start()
+        patch.object(interaction_tracking_routes, "remove_from_rollup", AsyncMock()).start()
+        patch.object(
+            interaction_tracking_routes, "get_lead_name",
+            AsyncMock(side_effect=lambda lead_id, *args: f"Lead {lead_id}")
+        ).start()
+        self.addCleanup(patch.stopall)
+
+    async def test_moving_an_interaction_invalidates_both_leads(self):
+        previous = interaction(1)
+        self.collection.find_one_and_update = AsyncMock(return_value=previous)
+        update = NewInteraction(
+            lead_id=2, interaction_type="Call", follow_up="No",
+            interaction_date=date(2026, 1, 5), interaction_time=time(9, 1)
+        )
+        result = await interaction_tracking_routes.update_interaction("1", str(previous["_id"]), update, Mock(), Mock())
+        self.assertEqual(result["lead_name"], "Lead 2")
+        tags = self.invalidate.call_args.args[1:]
+        self.assertIn("lead:1", tags)
+        self.assertIn("lead:2", tags)
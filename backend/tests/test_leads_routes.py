@@ -1,107 +1,227 @@
 import unittest
 from unittest.mock import Mock, patch
+import fakeredis
+import pytest
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.postgres_models import LeadModel
 from app.routes import leads_routes
 from app.services import lead_service
 
-class TestLeadRoutes(unittest.TestCase):
+class TestLeadRoutes(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.db = Mock(spec=Session)
+        self.db = Mock(spec=AsyncSession)
         self.lead_model = Mock(spec=LeadModel)
 
-    def test_get_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
-        result = leads_routes.get_lead_by_id(1, self.db)
-        self.assertEqual(result, self.lead_model)
+    async def test_get_lead_success(self):
+        self.lead_model.configure_mock(id=1, timezone="UTC", status="New")
+        self.lead_model.name = "Test Lead"
+        self.db.scalar.return_value = self.lead_model
+        result = await leads_routes.get_lead(1, self.db, fakeredis.FakeAsyncRedis(), True)
+        self.assertEqual(result, {"id": 1, "name": "Test Lead", "timezone": "UTC", "status": "New"})
 
-    def test_get_lead_by_id_not_found(self):
-        self.db.query.return_value.filter.return_value.first.return_value = None
+    async def test_get_lead_not_found(self):
+        self.db.scalar.return_value = None
         with self.assertRaises(HTTPException) as context:
-            leads_routes.get_lead_by_id(1, self.db)
+            await leads_routes.get_lead(1, self.db, fakeredis.FakeAsyncRedis(), True)
         self.assertEqual(context.exception.status_code, 404)
 
-    def test_create_new_lead_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = None
+    async def test_create_new_lead_success(self):
+        self.db.scalar.return_value = self.lead_model
         lead_data = Mock(name="Test Lead", address="Test Address", zipcode="12345", 
                          state="Test State", country="Test Country", timezone="UTC",
                          area_of_interest="Test Area", status="Active")
-        result = leads_routes.create_new_lead(lead_data, self.db)
-        self.assertTrue(self.db.add.called)
+        result = await leads_routes.create_new_lead(lead_data, self.db)
+        self.assertEqual(result, self.lead_model)
+        self.assertEqual(self.db.scalar.call_count, 1)
         self.assertTrue(self.db.commit.called)
-        self.assertTrue(self.db.refresh.called)
 
-    def test_create_new_lead_already_exists(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
+    async def test_create_new_lead_already_exists(self):
+        self.db.scalar.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: leads.name")
+        )
         lead_data = Mock(name="Existing Lead")
         with self.assertRaises(HTTPException) as context:
-            leads_routes.create_new_lead(lead_data, self.db)
+            await leads_routes.create_new_lead(lead_data, self.db)
         self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.detail, "Lead with this name already exists")
+        self.assertTrue(self.db.rollback.called)
 
-    def test_update_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
+    async def test_update_lead_by_id_success(self):
+        self.db.scalar.return_value = self.lead_model
         lead_data = Mock(name="Updated Lead", status="Inactive", address="New Address", 
                          zipcode="54321", state="New State", country="New Country",
                          area_of_interest="New Area", timezone="GMT")
-        result = leads_routes.update_lead_by_id(1, lead_data, self.db)
+        result = await leads_routes.update_lead_by_id(1, lead_data, self.db)
         self.assertEqual(result, self.lead_model)
+        self.assertEqual(self.db.scalar.call_count, 1)
         self.assertTrue(self.db.commit.called)
-        self.assertTrue(self.db.refresh.called)
+        self.assertFalse(self.db.refresh.called)
 
-    def test_delete_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
-        result = leads_routes.delete_lead_by_id(1, self.db)
+    async def test_update_lead_by_id_not_found(self):
+        self.db.scalar.return_value = None
+        with self.assertRaises(HTTPException) as context:
+            await lead_service.update_lead_by_id(1, Mock(), self.db)
+        self.assertEqual(context.exception.status_code, 404)
+
+    async def test_delete_lead_by_id_success(self):
+        self.db.scalar.return_value = self.lead_model
+        result = await leads_routes.delete_lead_by_id(1, self.db)
         self.assertEqual(result, {"message": "Lead deleted successfully"})
         self.assertTrue(self.db.delete.called)
         self.assertTrue(self.db.commit.called)
 
-class TestLeadService(unittest.TestCase):
+class TestLeadService(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.db = Mock(spec=Session)
+        self.db = Mock(spec=AsyncSession)
         self.lead_model = Mock(spec=LeadModel)
 
-    def test_get_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
-        result = lead_service.get_lead_by_id(1, self.db)
+    async def test_get_lead_by_id_success(self):
+        self.db.scalar.return_value = self.lead_model
+        result = await lead_service.get_lead_by_id(1, self.db)
         self.assertEqual(result, self.lead_model)
 
-    def test_get_lead_by_id_not_found(self):
-        self.db.query.return_value.filter.return_value.first.return_value = None
+    async def test_get_lead_by_id_not_found(self):
+        self.db.scalar.return_value = None
         with self.assertRaises(HTTPException) as context:
-            lead_service.get_lead_by_id(1, self.db)
+            await lead_service.get_lead_by_id(1, self.db)
         self.assertEqual(context.exception.status_code, 404)
 
-    def test_create_new_lead_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = None
+    async def test_create_new_lead_success(self):
+        self.db.scalar.return_value = self.lead_model
         lead_data = Mock(name="Test Lead", address="Test Address", zipcode="12345", 
                          state="Test State", country="Test Country", timezone="UTC",
                          area_of_interest="Test Area", status="Active")
-        result = lead_service.create_new_lead(lead_data, self.db)
-        self.assertTrue(self.db.add.called)
+        result = await lead_service.create_new_lead(lead_data, self.db)
+        self.assertEqual(result, self.lead_model)
+        self.assertEqual(self.db.scalar.call_count, 1)
         self.assertTrue(self.db.commit.called)
-        self.assertTrue(self.db.refresh.called)
 
-    def test_create_new_lead_already_exists(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
+    async def test_create_new_lead_already_exists(self):
+        self.db.scalar.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: leads.name")
+        )
         lead_data = Mock(name="Existing Lead")
         with self.assertRaises(HTTPException) as context:
-            lead_service.create_new_lead(lead_data, self.db)
+            await lead_service.create_new_lead(lead_data, self.db)
         self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.detail, "Lead with this name already exists")
+        self.assertTrue(self.db.rollback.called)
 
-    def test_update_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
+    async def test_update_lead_by_id_success(self):
+        self.db.scalar.return_value = self.lead_model
         lead_data = Mock(name="Updated Lead", status="Inactive", address="New Address", 
                          zipcode="54321", state="New State", country="New Country",
                          area_of_interest="New Area", timezone="GMT")
-        result = lead_service.update_lead_by_id(1, lead_data, self.db)
+        result = await lead_service.update_lead_by_id(1, lead_data, self.db)
         self.assertEqual(result, self.lead_model)
+        self.assertEqual(self.db.scalar.call_count, 1)
         self.assertTrue(self.db.commit.called)
-        self.assertTrue(self.db.refresh.called)
+        self.assertFalse(self.db.refresh.called)
 
-    def test_delete_lead_by_id_success(self):
-        self.db.query.return_value.filter.return_value.first.return_value = self.lead_model
-        result = lead_service.delete_lead_by_id(1, self.db)
+    async def test_delete_lead_by_id_success(self):
+        self.db.scalar.return_value = self.lead_model
+        result = await lead_service.delete_lead_by_id(1, self.db)
         self.assertEqual(result, {"message": "Lead deleted successfully"})
         self.assertTrue(self.db.delete.called)
-        self.assertTrue(self.db.commit.called)
\ No newline at end of file
+        self.assertTrue(self.db.commit.called)
+
+    async def test_get_leads_page_has_next_cursor(self):
+        leads = [Mock(spec=LeadModel, id=lead_id) for lead_id in (1, 2, 3)]
+        self.db.scalars.return_value = Mock(all=Mock(return_value=leads))
+        page, next_cursor = await lead_service.get_leads_page(self.db, limit=2)
+        self.assertEqual(page, leads[:2])
+        self.assertEqual(next_cursor, 2)
+
+    async def test_get_leads_page_last_page(self):
+        leads = [Mock(spec=LeadModel, id=lead_id) for lead_id in (4, 5)]
+        self.db.scalars.return_value = Mock(all=Mock(return_value=leads))
+        page, next_cursor = await lead_service.get_leads_page(self.db, cursor=3, limit=2)
+        self.assertEqual(page, leads)
+        self.assertIsNone(next_cursor)
+
+
+class TestLeadSummary(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = Mock(spec=AsyncSession)
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.lead_model = Mock(spec=LeadModel, id=1, timezone="UTC", status="New")
+        self.lead_model.name = "Test Lead"
+
+    async def test_get_lead_summary_reads_through(self):
+        self.db.scalar.return_value = self.lead_model
+        first = await lead_service.get_lead_summary(1, self.db, self.redis)
+        second = await lead_service.get_lead_summary(1, self.db, self.redis)
+        self.assertEqual(first, {"id": 1, "name": "Test Lead", "timezone": "UTC", "status": "New"})
+        self.assertEqual(first, second)
+        self.assertEqual(self.db.scalar.call_count, 1)
+
+    async def test_missing_lead_is_cached(self):
+        self.db.scalar.return_value = None
+        for _ in range(2):
+            with self.assertRaises(HTTPException) as context:
+                await lead_service.get_lead_summary(1, self.db, self.redis)
+            self.assertEqual(context.exception.status_code, 404)
+        self.assertEqual(self.db.scalar.call_count, 1)
+        self.assertLessEqual(await self.redis.ttl(lead_service.lead_summary_key(1)), lead_service.MISSING_LEAD_TTL)
+
+
+class TestLeadImport(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db = Mock(spec=AsyncSession)
+        self.redis = fakeredis.FakeAsyncRedis()
+
+    async def lines(self, *lines):
+        for line in lines:
+            yield line
+
+    async def test_import_reports_rejected_rows(self):
+        self.db.scalars.return_value = Mock(all=Mock(return_value=["Existing"]))
+        inserted = Mock(id=7, _mapping={"id": 7, "name": "New", "timezone": "UTC", "status": "New"})
+        self.db.execute.return_value = Mock(all=Mock(return_value=[inserted]))
+        report = await lead_service.import_leads(self.lines(
+            "name,address,zipcode,state,country,timezone,area_of_interest",
+            "Existing,a,1,s,IN,UTC,x",
+            "New,a,1,s,IN,UTC,x",
+            "New,a,1,s,IN,UTC,x",
+            "Incomplete,a",
+        ), "csv", self.db, self.redis)
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [1, 3, 4])
+        self.assertEqual(len(self.db.execute.call_args.args[1]), 1)
+        self.assertEqual(self.db.scalars.call_count, 1)
+        self.assertTrue(await self.redis.exists(lead_service.lead_summary_key(7)))
+
+
+@pytest.mark.usefixtures("temp_database")
+class TestLeadSearch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with self.SessionLocal() as db:
+            db.add_all([
+                LeadModel(name=name, address="a", zipcode="1", state="s", country=country,
+                          timezone="UTC", area_of_interest="x", status="new")
+                for name, country in [
+                    ("Acme Corp", "IN"), ("acme_labs", "US"), ("Globex", "IN"), ("Northacme", "IN")
+                ]
+            ])
+            db.commit()
+
+    async def search(self, *args, **kwargs):
+        async with self.AsyncSessionLocal() as db:
+            leads, next_offset = await lead_service.search_leads(db, *args, **kwargs)
+        return [lead.name for lead in leads], next_offset
+
+    async def test_prefix_search_is_case_insensitive(self):
+        self.assertEqual(await self.search("ACME"), (["Acme Corp", "acme_labs"], None))
+
+    async def test_wildcards_in_the_term_are_literal(self):
+        self.assertEqual(await self.search("acme_"), (["acme_labs"], None))
+
+    async def test_fuzzy_search_matches_substrings_with_filters(self):
+        names, _ = await self.search("acme", "fuzzy", {"country": "IN", "status": None})
+        self.assertEqual(names, ["Acme Corp", "Northacme"])
+
+    async def test_results_are_paginated(self):
+        self.assertEqual(await self.search(None, limit=3), (["Acme Corp", "Globex", "Northacme"], 3))
+        self.assertEqual(await self.search(None, offset=3, limit=3), (["acme_labs"], None))
@@ -0,0 +1,35 @@
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+from scripts import migrate_interaction_timestamps as migration
+
+
+class TestInteractionTimestampMigration(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.collection = Mock(bulk_write=AsyncMock())
+        patch.object(migration, "collection", self.collection).start()
+        self.addCleanup(patch.stopall)
+
+    def returns(self, batch):
+        cursor = Mock(to_list=AsyncMock(return_value=batch))
+        self.collection.find.return_value = Mock(sort=Mock(return_value=Mock(limit=Mock(return_value=cursor))))
+
+    async def test_batch_is_written_at_once_and_unparsable_dates_are_reported(self):
+        self.returns([
+            {"_id": 1, "interaction_date": "2026-01-05", "interaction_time": "09:30:00"},
+            {"_id": 2, "interaction_date": "05/01/2026", "interaction_time": "09:30:00"},
+            {"_id": 3, "interaction_date": "2026-01-06"},
+        ])
+        last, updated, invalid = await migration.migrate_batch(None, 3)
+        self.assertEqual((last, updated, invalid), (3, 2, [2]))
+        [updates] = self.collection.bulk_write.call_args.args
+        self.assertEqual(
+            [update._doc["$set"]["interaction_at"] for update in updates],
+            [datetime(2026, 1, 5, 9, 30), datetime(2026, 1, 6)]
+        )
+
+    async def test_next_batch_resumes_after_the_last_id(self):
+        self.returns([])
+        self.assertEqual(await migration.migrate_batch(3), (None, 0, []))
+        self.assertEqual(self.collection.find.call_args.args[0], {"interaction_at": {"$exists": False}, "_id": {"$gt": 3}})
+        self.assertFalse(self.collection.bulk_write.called)
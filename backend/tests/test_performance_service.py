@@ -0,0 +1,110 @@
+import unittest
+from datetime import date
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import performance_service
+
+
+def interaction(lead_id=1, date="2026-01-05", order=()):
+    return {"lead_id": lead_id, "interaction_date": date, "order": list(order)}
+
+
+class TestPerformanceRollups(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.rollups = Mock(
+            update_one=AsyncMock(), find_one_and_update=AsyncMock(), delete_one=AsyncMock()
+        )
+        self.buckets = Mock(update_one=AsyncMock(), delete_one=AsyncMock())
+        self.collection = Mock(find_one=AsyncMock())
+        patch.object(performance_service, "rollups", self.rollups).start()
+        patch.object(performance_service, "buckets", self.buckets).start()
+        patch.object(performance_service, "collection", self.collection).start()
+        self.addCleanup(patch.stopall)
+
+    def test_interaction_rollup_counts_orders_and_their_value(self):
+        rollup = performance_service.interaction_rollup(
+            interaction(order=[{"price": 2.5, "quantity": 2}, {"price": 1, "quantity": 3}])
+        )
+        self.assertEqual(rollup, {
+            "interaction_count": 1, "order_interaction_count": 1, "order_count": 2, "total_order_value": 8.0
+        })
+
+    async def test_added_interaction_is_counted_atomically(self):
+        await performance_service.add_to_rollup(interaction(order=[{"price": 5, "quantity": 1}]))
+        query, update = self.rollups.update_one.call_args.args
+        self.assertEqual(query, {"_id": 1})
+        self.assertEqual(update["$inc"]["total_order_value"], 5.0)
+        self.assertEqual(update["$max"], {"last_interaction_date": "2026-01-05"})
+        self.assertTrue(self.rollups.update_one.call_args.kwargs["upsert"])
+        self.buckets.update_one.assert_awaited_once_with(
+            {"lead_id": 1, "date": "2026-01-05"}, {"$inc": performance_service.interaction_rollup(
+                interaction(order=[{"price": 5, "quantity": 1}])
+            )}, upsert=True
+        )
+
+    async def test_removing_the_latest_interaction_moves_the_last_date_back(self):
+        self.rollups.find_one_and_update.return_value = {"interaction_count": 1, "last_interaction_date": "2026-01-05"}
+        self.collection.find_one.return_value = {"interaction_date": "2026-01-02"}
+        await performance_service.remove_from_rollup(interaction())
+        self.assertEqual(self.rollups.find_one_and_update.call_args.args[1]["$inc"]["interaction_count"], -1)
+        self.rollups.update_one.assert_awaited_once_with(
+            {"_id": 1, "last_interaction_date": "2026-01-05"}, {"$set": {"last_interaction_date": "2026-01-02"}}
+        )
+
+    async def test_removing_the_last_interaction_deletes_the_rollup(self):
+        self.rollups.find_one_and_update.return_value = {"interaction_count": 0, "last_interaction_date": "2026-01-05"}
+        await performance_service.remove_from_rollup(interaction())
+        self.rollups.delete_one.assert_awaited_once()
+        self.assertFalse(self.collection.find_one.called)
+        self.buckets.delete_one.assert_awaited_once_with(
+            {"lead_id": 1, "date": "2026-01-05", "interaction_count": {"$lte": 0}}
+        )
+
+    async def test_total_view_averages_over_interactions_with_orders(self):
+        rollup = {"_id": 1, "interaction_count": 4, "order_interaction_count": 2, "order_count": 3,
+                  "total_order_value": 30.0, "last_interaction_date": "2026-01-05"}
+        cursor = Mock(to_list=AsyncMock(return_value=[rollup]))
+        self.rollups.find = Mock(return_value=Mock(sort=Mock(return_value=cursor)))
+        db = Mock(spec=AsyncSession)
+        db.execute.return_value = [Mock(id=1)]
+        db.execute.return_value[0].name = "Lead"
+        [performance] = await performance_service.get_performance_data("total", db, 100)
+        self.assertEqual(performance["avg_order_value"], 15.0)
+        self.assertEqual(performance["lead_name"], "Lead")
+        self.rollups.find.assert_called_once_with({"order_interaction_count": {"$gt": 0}})
+
+    async def test_windowed_view_sums_the_daily_buckets_of_the_period(self):
+        cursor = Mock(to_list=AsyncMock(return_value=[]))
+        self.buckets.aggregate = Mock(return_value=cursor)
+        db = Mock(spec=AsyncSession)
+        db.execute.return_value = []
+        await performance_service.get_performance_data("well", db, 5, (date(2026, 1, 1), date(2026, 1, 7)))
+        pipeline = self.buckets.aggregate.call_args.args[0]
+        self.assertEqual(pipeline[0], {"$match": {"date": {"$gte": "2026-01-01", "$lte": "2026-01-07"}}})
+        self.assertEqual(pipeline[-2:], [{"$sort": {"order_count": -1}}, {"$limit": 5}])
+
+
+class TestPerformancePeriod(unittest.TestCase):
+    def test_window_ends_on_the_day_of_the_request(self):
+        self.assertEqual(
+            performance_service.performance_period("7d", today=date(2026, 3, 10)),
+            (date(2026, 3, 4), date(2026, 3, 10))
+        )
+        self.assertEqual(
+            performance_service.performance_period("7d", today=date(2026, 3, 11)),
+            (date(2026, 3, 5), date(2026, 3, 11))
+        )
+        self.assertIsNone(performance_service.performance_period("all"))
+
+    def test_explicit_range_takes_precedence(self):
+        self.assertEqual(
+            performance_service.performance_period("7d", date(2026, 1, 1), date(2026, 2, 1)),
+            (date(2026, 1, 1), date(2026, 2, 1))
+        )
+
+    def test_invalid_ranges_are_rejected(self):
+        for start, end in [(date(2026, 2, 1), date(2026, 1, 1)), (date(2024, 1, 1), date(2026, 1, 1))]:
+            with self.assertRaises(HTTPException) as context:
+                performance_service.performance_period("30d", start, end)
+            self.assertEqual(context.exception.status_code, 400)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.configs.database.pool import TimedAsyncQueuePool, pool_options, POOL_SIZE
+from app.configs.database.postgres_db import Base, async_engine, create_read_engine, to_async_url
+from app.models.postgres_models import LeadModel
+
+
+class TestPostgresDb(unittest.TestCase):
+    def test_async_url_uses_async_drivers(self):
+        self.assertEqual(to_async_url("postgresql://u@h/db").drivername, "postgresql+asyncpg")
+        self.assertEqual(to_async_url("sqlite:///./test.db").drivername, "sqlite+aiosqlite")
+
+    def test_async_url_renames_sslmode(self):
+        url = to_async_url("postgresql://u@h/db?sslmode=require")
+        self.assertEqual(dict(url.query), {"ssl": "require"})
+
+    def test_pool_options(self):
+        options = pool_options("postgresql://u@h/db", TimedAsyncQueuePool)
+        self.assertEqual(options["poolclass"], TimedAsyncQueuePool)
+        self.assertEqual(options["pool_size"], POOL_SIZE)
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertEqual(pool_options("sqlite:///./test.db", TimedAsyncQueuePool), {})
+
+
+class TestReadEngine(unittest.IsolatedAsyncioTestCase):
+    async def test_read_engine_falls_back_to_primary(self):
+        read_engine = create_read_engine(None)
+        self.assertIs(read_engine.sync_engine.pool, async_engine.sync_engine.pool)
+        self.assertTrue(read_engine.get_execution_options()["postgresql_readonly"])
+
+    async def test_read_engine_uses_replica(self):
+        with tempfile.TemporaryDirectory() as directory:
+            read_engine = create_read_engine(f"sqlite:///{os.path.join(directory, 'replica.db')}")
+            async with read_engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.execute(LeadModel.__table__.insert().values(
+                    name="Replica Lead", address="a", zipcode="1", state="s",
+                    country="IN", timezone="UTC", area_of_interest="x"
+                ))
+            async with async_sessionmaker(read_engine)() as db:
+                names = (await db.scalars(select(LeadModel.name))).all()
+            await read_engine.dispose()
+        self.assertEqual(names, ["Replica Lead"])
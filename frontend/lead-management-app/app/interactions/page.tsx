@@ -80,17 +80,24 @@ export default function Interactions() {
   const fetchInteractions = async () => {
     try {
       const token = localStorage.getItem('token')
-      const response = await fetch(`${config.BASE_URL}/interactions`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      })
-      if (response.ok) {
-        const data = await response.json()
-        setInteractions(data)
-      } else {
-        console.error('Failed to fetch interactions')
-      }
+      // Interactions are returned a page at a time; follow X-Next-Cursor until the last page
+      const allInteractions: NewInteraction[] = []
+      let cursor: string | null = null
+      do {
+        const query: string = cursor ? `?limit=200&cursor=${encodeURIComponent(cursor)}` : '?limit=200'
+        const response: Response = await fetch(`${config.BASE_URL}/interactions${query}`, {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        })
+        if (!response.ok) {
+          console.error('Failed to fetch interactions')
+          return
+        }
+        allInteractions.push(...await response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+      } while (cursor)
+      setInteractions(allInteractions)
     } catch (error) {
       console.error('Error fetching interactions:', error)
     }
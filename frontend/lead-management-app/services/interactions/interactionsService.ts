@@ -36,17 +36,24 @@ export interface AddInteraction {
 export const fetchInteractions = async (): Promise<Interaction[]> => {
     try {
       const token = localStorage.getItem('token')
-      const response = await fetch('http://127.0.0.1:8000/api/interactions', {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      })
-      if (response.ok) {
-        return await response.json()
-      } else {
-        console.error('Failed to fetch interactions')
-        return []
-      }
+      // Interactions are returned a page at a time; follow X-Next-Cursor until the last page
+      const interactions: Interaction[] = []
+      let cursor: string | null = null
+      do {
+        const query: string = cursor ? `?limit=200&cursor=${encodeURIComponent(cursor)}` : '?limit=200'
+        const response: Response = await fetch(`http://127.0.0.1:8000/api/interactions${query}`, {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        })
+        if (!response.ok) {
+          console.error('Failed to fetch interactions')
+          return []
+        }
+        interactions.push(...await response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+      } while (cursor)
+      return interactions
     } catch (error) {
       console.error('Error fetching interactions:', error)
       return []